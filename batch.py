@@ -0,0 +1,183 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from stayalive import EnhancedWebCrawler, ResultExporter, MemoryBudget, EXPORT_FORMATS, CAMPAIGNS_PATH, load_campaigns
+
+SUMMARY_FIELDS = ['start_url', 'crawl_mode', 'pages', 'matches', 'new_matches', 'gone_matches', 
+                  'errors', 'wall_time', 'output', 'metrics', 'failure']
+
+def read_start_urls(path):
+    urls = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith('#'):
+                continue
+            if not url.startswith(('http://', 'https://')):
+                url = f'https://{url}'
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+def site_slug(url):
+    slug = re.sub(r'^https?://', '', url).strip('/')
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', slug)[:120] or 'site'
+
+def crawl_site(start_url, crawl_mode, output_dir, max_workers=20, max_pages=None, disk_cache=True, fmt='csv', 
+               incremental=False, bounded_memory=False, parse_processes=0, campaigns=None):
+    started = time.time()
+    output = os.path.join(output_dir, 'sites', f"{site_slug(start_url)}.{fmt}")
+    cache_options = {} if disk_cache else {'redirect_cache_path': None, 'response_cache_path': None, 
+                                             'script_cache_path': None, 'match_index_path': None}
+    crawler = EnhancedWebCrawler(start_url, crawl_mode, max_workers=max_workers, incremental=incremental, 
+                                 memory_budget=MemoryBudget() if bounded_memory else None, 
+                                 parse_processes=parse_processes, campaigns=campaigns, **cache_options)
+    if max_pages:
+        crawler.max_pages = max_pages
+    failure = ''
+    exporter = ResultExporter(output, fmt)
+    crawler.results.add_listener(exporter.write)
+    try:
+        crawler.crawl(on_page=lambda url, new_urls: exporter.flush())
+    except Exception as e:
+        failure = str(e)
+    exporter.close()
+    crawler.close()
+    metrics_output = crawler.export_metrics(os.path.join(output_dir, 'metrics', site_slug(start_url)), final=True)
+    return {
+        'start_url': start_url,
+        'crawl_mode': crawl_mode,
+        'pages': crawler.pages_crawled,
+        'matches': len(crawler.results),
+        'new_matches': crawler.match_changes.count('new') if incremental else '',
+        'gone_matches': crawler.match_changes.count('gone') if incremental else '',
+        'errors': crawler.status_messages.errors,
+        'wall_time': round(time.time() - started, 2),
+        'output': output,
+        'metrics': metrics_output,
+        'failure': failure
+    }
+
+class CombinedOutput:
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.writer = None
+        if fmt != 'parquet':
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+
+    def append(self, site_output):
+        if self.fmt == 'parquet':
+            import pyarrow.parquet
+            table = pyarrow.parquet.read_table(site_output)
+            if self.writer is None:
+                self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+            return
+        with open(site_output, newline='', encoding='utf-8') as f:
+            if self.fmt == 'csv':
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if self.writer is None:
+                    self.writer = csv.writer(self.file)
+                    if header:
+                        self.writer.writerow(header)
+                self.writer.writerows(reader)
+            else:
+                for line in f:
+                    self.file.write(line)
+        self.file.flush()
+
+    def close(self):
+        if self.fmt == 'parquet':
+            if self.writer is not None:
+                self.writer.close()
+        else:
+            self.file.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl many sites in parallel with EnhancedWebCrawler.")
+    parser.add_argument('url_file', help="File with one start URL per line")
+    parser.add_argument('--mode', choices=['Quick', 'Standard', 'Complete'], default='Standard')
+    parser.add_argument('--output-dir', default=f"batch_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="Sites crawled in parallel (default: CPU count)")
+    parser.add_argument('--workers', type=int, default=20, help="Concurrent fetches per site")
+    parser.add_argument('--max-pages', type=int, default=None, help="Override the mode's page budget")
+    parser.add_argument('--no-disk-cache', action='store_true', help="Disable the shared on-disk caches")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help="Result file format")
+    parser.add_argument('--incremental', action='store_true', 
+                        help="Reuse stored results for pages whose content has not changed")
+    parser.add_argument('--parse-processes', type=int, default=0, 
+                        help="Parse pages of each site in this many worker processes (0 parses in-thread). "
+                             "Capped at one less than the CPU count; only pays off on large pages.")
+    parser.add_argument('--bounded-memory', action='store_true', 
+                        help="Keep memory flat on very large sites (Bloom-filter visited set, results spilled to disk)")
+    parser.add_argument('--campaigns', default=None, help=f"Campaign config file (default: {CAMPAIGNS_PATH})")
+    parser.add_argument('--campaign', action='append', default=None, 
+                        help="Only match this campaign (repeatable; default: every campaign in the config)")
+    args = parser.parse_args(argv)
+
+    campaigns = load_campaigns(args.campaigns)
+    if args.campaign:
+        unknown = set(args.campaign) - {campaign.name for campaign in campaigns}
+        if unknown:
+            parser.error(f"Unknown campaign(s): {', '.join(sorted(unknown))}")
+        campaigns = [campaign for campaign in campaigns if campaign.name in args.campaign]
+    start_urls = read_start_urls(args.url_file)
+    os.makedirs(os.path.join(args.output_dir, 'sites'), exist_ok=True)
+    combined = CombinedOutput(os.path.join(args.output_dir, f"combined.{args.format}"), args.format)
+    summary_path = os.path.join(args.output_dir, 'summary.csv')
+    summaries = []
+    batch_started = time.time()
+
+    with open(summary_path, 'w', newline='', encoding='utf-8') as summary_file, \
+         ProcessPoolExecutor(max_workers=args.processes) as pool:
+        summary_writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_FIELDS)
+        summary_writer.writeheader()
+        futures = {
+            pool.submit(crawl_site, url, args.mode, args.output_dir, args.workers,
+                        args.max_pages, not args.no_disk_cache, args.format, args.incremental, 
+                        args.bounded_memory, args.parse_processes, campaigns): url
+            for url in start_urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'start_url': url, 'crawl_mode': args.mode, 'pages': 0, 'matches': 0,
+                           'new_matches': '', 'gone_matches': '', 'errors': 1, 'wall_time': 0, 
+                           'output': '', 'metrics': '', 'failure': str(e)}
+            if summary['output']:
+                combined.append(summary['output'])
+            summary_writer.writerow(summary)
+            summary_file.flush()
+            summaries.append(summary)
+            print(f"[{len(summaries)}/{len(start_urls)}] {url}: {summary['pages']} pages, "
+                  f"{summary['matches']} matches, {summary['errors']} errors, {summary['wall_time']}s"
+                  + (f" FAILED: {summary['failure']}" if summary['failure'] else ''), flush=True)
+    combined.close()
+
+    totals = {
+        'sites': len(summaries),
+        'pages': sum(s['pages'] for s in summaries),
+        'matches': sum(s['matches'] for s in summaries),
+        'errors': sum(s['errors'] for s in summaries),
+        'wall_time': round(time.time() - batch_started, 2)
+    }
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'totals': totals, 'sites': summaries}, f, indent=2)
+    print(f"Done: {totals['sites']} sites, {totals['pages']} pages, {totals['matches']} matches, "
+          f"{totals['errors']} errors in {totals['wall_time']}s. Output: {args.output_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
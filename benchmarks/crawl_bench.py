@@ -0,0 +1,187 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from site_server import SiteServer, add_site_arguments, site_config_from_args
+
+MODES = ['Quick', 'Standard', 'Complete']
+# Metric name -> True when a larger value is better.
+COMPARED = {'pages_per_second': True, 'p50_latency_ms': False, 'p99_latency_ms': False, 'peak_rss_mb': False}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_crawl(start_url, mode, options):
+    from stayalive import EnhancedWebCrawler, MemoryBudget
+
+    crawler = EnhancedWebCrawler(start_url, mode, max_workers=options['workers'],
+                                 requests_per_second=options['rps'], redirect_cache_path=None,
+                                 response_cache_path=None, script_cache_path=None, 
+                                 match_index_path=None, 
+                                 parser_backend=options['parser'], 
+                                 memory_budget=MemoryBudget() if options['bounded_memory'] else None, 
+                                 parse_processes=options['parse_processes'])
+    if options['max_pages']:
+        crawler.max_pages = options['max_pages']
+    latencies = []
+    crawl_claimed_url = crawler.crawl_claimed_url
+
+    def timed_crawl(url, *args):
+        started = time.perf_counter()
+        try:
+            return crawl_claimed_url(url, *args)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    crawler.crawl_claimed_url = timed_crawl
+    started = time.perf_counter()
+    crawler.crawl()
+    elapsed = time.perf_counter() - started
+    crawler.close()
+    return {
+        'mode': mode,
+        'pages': crawler.pages_crawled,
+        'matches': len(crawler.results),
+        'errors': crawler.status_messages.errors,
+        'wall_time': round(elapsed, 3),
+        'pages_per_second': round(crawler.pages_crawled / elapsed, 2) if elapsed else 0.0,
+        'p50_latency_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_latency_ms': round(percentile(latencies, 99) * 1000, 2),
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+                             (1048576 if sys.platform == 'darwin' else 1024), 1),
+        'stages': crawler.metrics.snapshot()['stages']
+    }
+
+def crawl_in_child(start_url, mode, options, queue):
+    try:
+        queue.put(run_crawl(start_url, mode, options))
+    except Exception as e:
+        queue.put({'mode': mode, 'failure': str(e)})
+
+def run_isolated(start_url, mode, options):
+    # Each crawl runs in a fresh process so peak RSS is measured per crawl.
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=crawl_in_child, args=(start_url, mode, options, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def summarize(runs):
+    ok = [run for run in runs if 'failure' not in run]
+    if not ok:
+        return {'failure': runs[-1].get('failure', 'no runs')}
+    summary = {key: statistics.median(run[key] for run in ok)
+               for key in ('pages', 'matches', 'errors', 'wall_time', *COMPARED)}
+    summary['runs'] = len(ok)
+    return summary
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ''
+
+def compare(report, baseline, threshold):
+    regressions = []
+    print(f"\nComparison against {baseline.get('revision') or 'baseline'}:")
+    if baseline.get('site') != report['site'] or baseline.get('crawler') != report['crawler']:
+        print("  note: site or crawler settings differ from the baseline")
+    for mode, current in report['summary'].items():
+        previous = baseline.get('summary', {}).get(mode)
+        if not previous or 'failure' in current or 'failure' in previous:
+            continue
+        if current['matches'] != previous['matches']:
+            print(f"  {mode}: matches changed {previous['matches']} -> {current['matches']}")
+        for key, higher_is_better in COMPARED.items():
+            if not previous[key]:
+                continue
+            change = (current[key] - previous[key]) / previous[key] * 100
+            worse = -change if higher_is_better else change
+            flag = ' REGRESSION' if threshold is not None and worse > threshold else ''
+            if flag:
+                regressions.append(f"{mode} {key}")
+            print(f"  {mode:<9} {key:<17} {previous[key]:>10} -> {current[key]:>10} ({change:+.1f}%){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EnhancedWebCrawler against a local synthetic site.")
+    add_site_arguments(parser)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=20)
+    parser.add_argument('--rps', type=float, default=200.0, help="Per-host request rate given to the crawler")
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4')
+    parser.add_argument('--max-pages', type=int, default=None, help="Override each mode's page budget")
+    parser.add_argument('--bounded-memory', action='store_true', help="Crawl with a MemoryBudget")
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help="Parse pages in this many processes (capped at one less than the CPU count)")
+    parser.add_argument('--output', default=None, help="Write the JSON report here")
+    parser.add_argument('--compare', default=None, help="Earlier JSON report to compare against")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="Exit non-zero when a metric is this many percent worse than --compare")
+    args = parser.parse_args()
+
+    config = site_config_from_args(args)
+    options = {'workers': args.workers, 'rps': args.rps, 'parser': args.parser, 'max_pages': args.max_pages, 
+               'bounded_memory': args.bounded_memory, 'parse_processes': args.parse_processes}
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'site': config.to_dict(),
+        'crawler': options,
+        'runs': {},
+        'summary': {}
+    }
+    with SiteServer(config) as server:
+        for mode in args.modes:
+            runs = []
+            for i in range(args.repeat):
+                result = run_isolated(server.url, mode, options)
+                runs.append(result)
+                if 'failure' in result:
+                    print(f"{mode} run {i + 1}: FAILED: {result['failure']}", flush=True)
+                else:
+                    print(f"{mode} run {i + 1}: {result['pages']} pages, {result['matches']} matches, "
+                          f"{result['pages_per_second']} pages/s, p50 {result['p50_latency_ms']} ms, "
+                          f"p99 {result['p99_latency_ms']} ms, peak RSS {result['peak_rss_mb']} MB", flush=True)
+            report['runs'][mode] = runs
+            report['summary'][mode] = summarize(runs)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report['summary'], indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
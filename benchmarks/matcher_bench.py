@@ -0,0 +1,103 @@
+import argparse
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import KeywordMatcher, DEFAULT_CAMPAIGNS, KEYWORDS
+
+def legacy_get_matched_keywords(keywords, text):
+    if not isinstance(text, str) or not text.strip():
+        return []
+    text_lower = text.lower().strip()
+    exact_matches = []
+    for kw in keywords:
+        kw_lower = kw.lower()
+        pattern = rf'(?:^|\s|[-_/=]){re.escape(kw_lower)}(?:$|\s|[-_/=])'
+        if re.search(pattern, text_lower):
+            exact_matches.append(kw)
+        kw_encoded = kw.replace(' ', '%20')
+        pattern_encoded = rf'(?:^|\s|[-_/=]){re.escape(kw_encoded)}(?:$|\s|[-_/=])'
+        if re.search(pattern_encoded, text_lower):
+            exact_matches.append(kw)
+    url_patterns = [
+        r'(?:https?://)?(?:www\.)?gowithguide\.com',
+        r'utm_source=([^&]*)',
+        r'utm_campaign=([^&]*)',
+        r'sv1=([^&]*)',
+        r'awc=([^&]*)',
+        r'87121(?:_\d+|%5F\d+)?'
+    ]
+    for pattern in url_patterns:
+        matches = re.findall(pattern, text_lower)
+        for match in matches:
+            if isinstance(match, str):
+                for kw in keywords:
+                    if kw.lower() in match.lower():
+                        exact_matches.append(kw)
+    return list(set(exact_matches))
+
+def load_page(source):
+    if os.path.exists(source):
+        with open(source, 'rb') as f:
+            return source, f.read()
+    response = requests.get(source, headers={'User-Agent': 'Mozilla/5.0'}, timeout=15)
+    response.raise_for_status()
+    return response.url, response.content
+
+def page_strings(base_url, html):
+    soup = BeautifulSoup(html, 'lxml')
+    strings = []
+    for element in soup.find_all(['a', 'div', 'span', 'p', 'title', 'img', 'meta']):
+        if element.has_attr('href'):
+            strings.append(urljoin(base_url, element['href'].strip()))
+            strings.append(element.get_text(separator=' ', strip=True))
+        if element.name in ['p', 'div', 'span', 'title']:
+            strings.append(element.get_text(separator=' ', strip=True))
+        if element.name == 'meta' and element.get('content'):
+            strings.append(element['content'].strip())
+        if element.name == 'img' and element.get('alt'):
+            strings.append(element['alt'].strip())
+    return strings
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare KeywordMatcher against the legacy get_matched_keywords.")
+    parser.add_argument('sources', nargs='+', help="Page URLs or saved HTML files")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    strings = []
+    for source in args.sources:
+        base_url, html = load_page(source)
+        page = page_strings(base_url, html)
+        print(f"{source}: {len(page)} strings, {sum(len(s) for s in page)} chars")
+        strings.extend(page)
+
+    matcher = KeywordMatcher(DEFAULT_CAMPAIGNS)
+    mismatches = [s for s in strings 
+                  if {kw for _, kw in matcher.match(s)} != set(legacy_get_matched_keywords(KEYWORDS, s))]
+    legacy_time = best_of(args.repeat, lambda: [legacy_get_matched_keywords(KEYWORDS, s) for s in strings])
+    matcher_time = best_of(args.repeat, lambda: [matcher.match(s) for s in strings])
+
+    print(f"strings:   {len(strings)}")
+    print(f"legacy:    {legacy_time * 1000:.2f} ms")
+    print(f"matcher:   {matcher_time * 1000:.2f} ms")
+    print(f"speedup:   {legacy_time / matcher_time:.1f}x")
+    print(f"mismatches: {len(mismatches)}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import argparse
+import gzip
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+CATEGORIES = ['travel', 'blog', 'resources', 'guides', 'news']
+
+class SiteConfig:
+    def __init__(self, pages=500, dom_depth=6, links_per_page=8, inline_scripts=2, external_scripts=2, redirect_hops=2,
+                 match_every=25, slow_every=0, slow_delay=0.5, error_every=0, latency=0.0,
+                 sitemap=True, seed=1):
+        self.pages = pages
+        self.dom_depth = dom_depth
+        self.links_per_page = links_per_page
+        self.inline_scripts = inline_scripts
+        self.external_scripts = external_scripts
+        self.redirect_hops = redirect_hops
+        self.match_every = match_every
+        self.slow_every = slow_every
+        self.slow_delay = slow_delay
+        self.error_every = error_every
+        self.latency = latency
+        self.sitemap = sitemap
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+class SyntheticSite:
+    def __init__(self, config):
+        self.config = config
+
+    def post_path(self, i):
+        return f"/blog/2024/{1 + i % 12:02d}/post-{i}"
+
+    def category_of(self, i):
+        return CATEGORIES[i % len(CATEGORIES)]
+
+    def is_match_page(self, i):
+        return bool(self.config.match_every) and i % self.config.match_every == self.config.match_every - 1
+
+    def nested(self, inner, rng):
+        for level in range(self.config.dom_depth):
+            tag = rng.choice(['div', 'section', 'article', 'span'])
+            inner = f'<{tag} class="l{level}">{inner}</{tag}>'
+        return inner
+
+    def scripts(self, i, rng):
+        blocks = []
+        for k in range(self.config.inline_scripts):
+            blocks.append(f'<script>window.cfg{k} = {{"id": {i}, "url": "/static/app-{rng.randint(0, 99)}.js", '
+                          f'"items": [{", ".join(str(rng.randint(0, 999)) for _ in range(20))}]}};</script>')
+        for k in range(self.config.external_scripts):
+            blocks.append(f'<script src="/static/bundle-{k}.js"></script>')
+        return ''.join(blocks)
+
+    def bundle(self, k, host):
+        rng = random.Random(self.config.seed * 31 + k)
+        endpoints = ',\n'.join(f'  "link{n}": "http://{host}{self.post_path(rng.randrange(self.config.pages))}"'
+                                for n in range(50))
+        return f'/* bundle {k} */\nwindow.bundle{k} = {{\n{endpoints}\n}};\n' + '// padding\n' * 2000
+
+    def nav(self):
+        return '<nav>' + ''.join(f'<a href="/category/{name}/">{name.title()}</a>' for name in CATEGORIES) + '</nav>'
+
+    def redirect_host(self, host):
+        # Redirect chains are served under a second host name so the crawler treats them as external links.
+        name, _, port = host.partition(':')
+        other = 'localhost' if name != 'localhost' else '127.0.0.1'
+        return f"{other}:{port}" if port else other
+
+    def affiliate_block(self, i, host):
+        link = f'http://{self.redirect_host(host)}/r/{i}/0'
+        if i % 2:
+            return (f'<p>Book a private tour with <b>GoWithGuide</b> today. '
+                    f'<a href="{link}">See the guides</a></p>')
+        return f'<a href="{link}"><img src="/static/banner.png" alt="go with guide banner"></a>'
+
+    def post(self, i, host):
+        rng = random.Random(self.config.seed * 1000003 + i)
+        links = []
+        for _ in range(self.config.links_per_page):
+            target = rng.randrange(self.config.pages)
+            links.append(f'<a href="{self.post_path(target)}">Post {target}</a>')
+        paragraphs = ''.join(f'<p>Paragraph {k} of post {i} about {self.category_of(i)} in town {rng.randint(0, 500)}.</p>'
+                             for k in range(3))
+        body = paragraphs + ' '.join(links)
+        if self.is_match_page(i):
+            body += self.affiliate_block(i, host)
+        return (f'<html><head><title>Post {i}</title><meta name="description" content="Synthetic post {i}">'
+                f'{self.scripts(i, rng)}</head><body>{self.nav()}{self.nested(body, rng)}</body></html>')
+
+    def home(self):
+        rng = random.Random(self.config.seed)
+        links = ''.join(f'<a href="{self.post_path(i)}">Post {i}</a>'
+                        for i in range(min(self.config.links_per_page, self.config.pages)))
+        return (f'<html><head><title>Synthetic site</title>{self.scripts(0, rng)}</head>'
+                f'<body>{self.nav()}{self.nested(links, rng)}</body></html>')
+
+    def category(self, name):
+        index = CATEGORIES.index(name)
+        rng = random.Random(self.config.seed * 7919 + index)
+        links = ''.join(f'<a href="{self.post_path(i)}">Post {i}</a>'
+                        for i in range(index, self.config.pages, len(CATEGORIES)))
+        return (f'<html><head><title>{name.title()}</title></head>'
+                f'<body>{self.nav()}{self.nested(links, rng)}</body></html>')
+
+    def sitemap(self, host):
+        urls = ''.join(f'<url><loc>http://{host}{self.post_path(i)}</loc>'
+                       f'<lastmod>2024-{1 + i % 12:02d}-01</lastmod></url>' for i in range(self.config.pages))
+        return gzip.compress(('<?xml version="1.0" encoding="UTF-8"?>'
+                              '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                              f'{urls}</urlset>').encode('utf-8'))
+
+    def robots(self, host):
+        lines = ['User-agent: *', 'Allow: /']
+        if self.config.sitemap:
+            lines.append(f'Sitemap: http://{host}/sitemap.xml.gz')
+        return '\n'.join(lines) + '\n'
+
+def make_handler(site, stats):
+    config = site.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            self.route(head=True)
+
+        def do_GET(self):
+            self.route()
+
+        def reply(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None, head=False):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if body and not head:
+                self.wfile.write(body)
+
+        def route(self, head=False):
+            with stats['lock']:
+                stats['requests'] += 1
+            if config.latency:
+                time.sleep(config.latency)
+            parts = urlsplit(self.path)
+            path = parts.path
+            host = self.headers.get('Host', 'localhost')
+            if path == '/':
+                return self.reply(200, site.home().encode('utf-8'), head=head)
+            if path == '/robots.txt':
+                return self.reply(200, site.robots(host).encode('utf-8'), 'text/plain', head=head)
+            if path == '/sitemap.xml.gz' and config.sitemap:
+                return self.reply(200, site.sitemap(host), 'application/x-gzip', head=head)
+            if path.startswith('/category/'):
+                name = path.strip('/').split('/')[-1]
+                if name in CATEGORIES:
+                    return self.reply(200, site.category(name).encode('utf-8'), head=head)
+            if path.startswith('/blog/'):
+                try:
+                    i = int(path.rsplit('-', 1)[-1])
+                except ValueError:
+                    i = -1
+                if 0 <= i < config.pages:
+                    if config.error_every and i % config.error_every == config.error_every - 1:
+                        return self.reply(500, b'error', head=head)
+                    if config.slow_every and i % config.slow_every == config.slow_every - 1:
+                        time.sleep(config.slow_delay)
+                    return self.reply(200, site.post(i, host).encode('utf-8'), head=head)
+            if path.startswith('/r/'):
+                _, _, page, hop = path.split('/')[:4]
+                if int(hop) + 1 < config.redirect_hops:
+                    location = f'/r/{page}/{int(hop) + 1}'
+                else:
+                    location = f'/landing?utm_source=87121_{page}&sv1=87121'
+                return self.reply(302, headers={'Location': location}, head=head)
+            if path == '/landing':
+                ref = parse_qs(parts.query).get('utm_source', [''])[0]
+                return self.reply(200, f'<html><body>Landing {ref}</body></html>'.encode('utf-8'), head=head)
+            if path.startswith('/static/bundle-') and path.endswith('.js'):
+                try:
+                    k = int(path[len('/static/bundle-'):-3])
+                except ValueError:
+                    k = -1
+                if 0 <= k < config.external_scripts:
+                    return self.reply(200, site.bundle(k, host).encode('utf-8'), 'application/javascript', head=head)
+            if path.startswith('/static/'):
+                return self.reply(200, b'', 'application/octet-stream', head=head)
+            return self.reply(404, b'not found', head=head)
+
+    return Handler
+
+class SiteServer:
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or SiteConfig()
+        self.site = SyntheticSite(self.config)
+        self.stats = {'lock': threading.Lock(), 'requests': 0}
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.site, self.stats))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def requests_served(self):
+        return self.stats['requests']
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def add_site_arguments(parser):
+    defaults = SiteConfig()
+    parser.add_argument('--pages', type=int, default=defaults.pages, help="Posts on the synthetic site")
+    parser.add_argument('--dom-depth', type=int, default=defaults.dom_depth, help="Wrapper elements around each post body")
+    parser.add_argument('--links-per-page', type=int, default=defaults.links_per_page)
+    parser.add_argument('--inline-scripts', type=int, default=defaults.inline_scripts)
+    parser.add_argument('--external-scripts', type=int, default=defaults.external_scripts,
+                        help="Site-wide <script src> bundles included on every page")
+    parser.add_argument('--redirect-hops', type=int, default=defaults.redirect_hops,
+                        help="Redirects before an affiliate link lands")
+    parser.add_argument('--match-every', type=int, default=defaults.match_every,
+                        help="Every Nth post links to the affiliate (0 disables)")
+    parser.add_argument('--slow-every', type=int, default=defaults.slow_every, help="Every Nth post is slow (0 disables)")
+    parser.add_argument('--slow-delay', type=float, default=defaults.slow_delay)
+    parser.add_argument('--error-every', type=int, default=defaults.error_every,
+                        help="Every Nth post returns 500 (0 disables)")
+    parser.add_argument('--latency', type=float, default=defaults.latency, help="Delay added to every response")
+    parser.add_argument('--no-sitemap', action='store_true')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+def site_config_from_args(args):
+    return SiteConfig(pages=args.pages, dom_depth=args.dom_depth, links_per_page=args.links_per_page,
+                      inline_scripts=args.inline_scripts, external_scripts=args.external_scripts, 
+                      redirect_hops=args.redirect_hops,
+                      match_every=args.match_every, slow_every=args.slow_every, slow_delay=args.slow_delay,
+                      error_every=args.error_every, latency=args.latency, sitemap=not args.no_sitemap,
+                      seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic site for crawler benchmarks.")
+    add_site_arguments(parser)
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    server = SiteServer(site_config_from_args(args), port=args.port)
+    print(f"Serving {args.pages} posts at {server.url}", flush=True)
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
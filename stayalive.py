@@ -1,32 +1,2562 @@
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs
-from collections import deque
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
+import lxml.etree
+import lxml.html
+from urllib.parse import urljoin, urlparse, parse_qs, urlsplit, urlunsplit, parse_qsl, urlencode
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+import codecs
 import csv
 import datetime
+import email.utils
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import queue
 import re
+import socket
+import sqlite3
+import sys
+import threading
+import random
 import time
-from io import StringIO
+import urllib.robotparser
+import urllib3
+import urllib3.connection
+
+URL_PATTERNS = [
+    r'(?:https?://)?(?:www\.)?gowithguide\.com',
+    r'utm_source=([^&]*)',
+    r'utm_campaign=([^&]*)',
+    r'sv1=([^&]*)',
+    r'awc=([^&]*)',
+    r'87121(?:_\d+|%5F\d+)?'
+]
+
+KEYWORDS = ["gowithguide", "go with guide", "go-with-guide", "87121"]
+
+CAMPAIGNS_PATH = os.environ.get('STAYALIVE_CAMPAIGNS', 
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'campaigns.json'))
+
+class Campaign:
+    def __init__(self, name, keywords, url_patterns=()):
+        self.name = name
+        self.keywords = list(keywords)
+        self.url_patterns = list(url_patterns)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['keywords'], data.get('url_patterns', ()))
+
+    def to_dict(self):
+        return {'name': self.name, 'keywords': self.keywords, 'url_patterns': self.url_patterns}
+
+DEFAULT_CAMPAIGNS = [Campaign('gowithguide', KEYWORDS, URL_PATTERNS)]
+
+def load_campaigns(path=None):
+    if path is None:
+        path = CAMPAIGNS_PATH
+        if not os.path.exists(path):
+            return list(DEFAULT_CAMPAIGNS)
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    campaigns = []
+    for data in config.get('campaigns', []):
+        if not data.get('name') or not data.get('keywords'):
+            raise ValueError(f"Campaign in {path} needs a name and at least one keyword: {data!r}")
+        if any(campaign.name == data['name'] for campaign in campaigns):
+            raise ValueError(f"Duplicate campaign name in {path}: {data['name']}")
+        for pattern in data.get('url_patterns', ()):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Bad URL pattern {pattern!r} in campaign {data['name']}: {str(e)}")
+        campaigns.append(Campaign.from_dict(data))
+    if not campaigns:
+        raise ValueError(f"No campaigns defined in {path}")
+    return campaigns
+
+def campaigns_signature(campaigns):
+    config = json.dumps([campaign.to_dict() for campaign in campaigns], sort_keys=True)
+    return hashlib.sha1(config.encode('utf-8')).hexdigest()
+
+BOUNDARY_CHARS = re.compile(r'[\s\-_/=]')
+
+class KeywordMatcher:
+    # Every campaign's terms go into one alternation, so a page is scanned once however many 
+    # campaigns are configured; each term maps back to the (campaign, keyword) pairs it stands for.
+    def __init__(self, campaigns=DEFAULT_CAMPAIGNS):
+        self.campaigns = list(campaigns)
+        self.terms = defaultdict(set)
+        self.order = {}
+        for campaign in self.campaigns:
+            for kw in campaign.keywords:
+                tag = (campaign.name, kw)
+                self.order.setdefault(tag, len(self.order))
+                self.terms[kw.lower()].add(tag)
+                self.terms[kw.replace(' ', '%20')].add(tag)
+        alternatives = sorted(self.terms, key=len, reverse=True)
+        self.keyword_regex = re.compile(
+            r'(?:^|(?<=[\s\-_/=]))(?=(' + '|'.join(re.escape(t) for t in alternatives) + r')(?:$|\s|[-_/=]))'
+        )
+        self.implied = {term: self._implied_terms(term) for term in alternatives}
+        url_campaigns = defaultdict(list)
+        for campaign in self.campaigns:
+            for pattern in campaign.url_patterns:
+                url_campaigns[pattern].append(campaign)
+        self.url_regexes = [(re.compile(pattern), [(kw.lower(), (campaign.name, kw)) 
+                                                   for campaign in owners for kw in campaign.keywords])
+                            for pattern, owners in url_campaigns.items()]
+        self.url_trigger = re.compile('|'.join(f'(?:{pattern})' for pattern in url_campaigns)) if url_campaigns else None
+
+    def _implied_terms(self, term):
+        implied = set()
+        for other in self.terms:
+            if other == term:
+                continue
+            start = term.find(other)
+            while start != -1:
+                end = start + len(other)
+                if ((start == 0 or BOUNDARY_CHARS.match(term[start - 1])) and 
+                    (end == len(term) or BOUNDARY_CHARS.match(term[end]))):
+                    implied.add(other)
+                    break
+                start = term.find(other, start + 1)
+        return implied
+
+    def match(self, text):
+        if not isinstance(text, str) or not text.strip():
+            return []
+        text_lower = text.lower().strip()
+        found_terms = set()
+        for term in self.keyword_regex.findall(text_lower):
+            if term not in found_terms:
+                found_terms.add(term)
+                found_terms.update(self.implied[term])
+        matched = set()
+        for term in found_terms:
+            matched.update(self.terms[term])
+        if self.url_trigger is not None and self.url_trigger.search(text_lower):
+            for regex, keywords in self.url_regexes:
+                for match in regex.findall(text_lower):
+                    if isinstance(match, str):
+                        match_lower = match.lower()
+                        for kw_lower, tag in keywords:
+                            if kw_lower in match_lower:
+                                matched.add(tag)
+        return sorted(matched, key=self.order.get)
+
+CACHE_DIR = os.environ.get('STAYALIVE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'stayalive'))
+
+class RedirectPolicy:
+    STATIC_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.xml', '.png', '.jpg', '.jpeg', '.gif', 
+                         '.svg', '.webp', '.avif', '.ico', '.bmp', '.woff', '.woff2', '.ttf', 
+                         '.otf', '.eot', '.mp3', '.mp4', '.webm', '.mov', '.pdf', '.zip')
+    INTERNAL_REDIRECT_PATTERN = (r'/(?:go|out|goto|recommends?|refer|ref|link|links|visit|'
+                                 r'aff|affiliate|redirect|click|track)(?:/|$)|'
+                                 r'[?&](?:url|u|dest|destination|redirect|redirect_url|target|to)=')
+
+    def __init__(self, skip_internal=True, skip_static=True, static_extensions=STATIC_EXTENSIONS, 
+                 internal_redirect_pattern=INTERNAL_REDIRECT_PATTERN):
+        self.skip_internal = skip_internal
+        self.skip_static = skip_static
+        self.static_extensions = tuple(ext.lower() for ext in static_extensions)
+        self.internal_redirect_regex = re.compile(internal_redirect_pattern, re.IGNORECASE) if internal_redirect_pattern else None
+
+    def should_resolve(self, url, is_internal):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+            return False
+        if self.skip_static and parsed.path.lower().endswith(self.static_extensions):
+            return False
+        if self.skip_internal and is_internal(parsed.netloc):
+            path_and_query = parsed.path + ('?' + parsed.query if parsed.query else '')
+            return bool(self.internal_redirect_regex and self.internal_redirect_regex.search(path_and_query))
+        return True
+
+class RedirectCache:
+    def __init__(self, path=os.path.join(CACHE_DIR, 'redirects.sqlite'), ttl=7 * 24 * 3600, 
+                 purge_interval=24 * 3600):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS redirects (
+                url TEXT PRIMARY KEY, final_url TEXT NOT NULL, history TEXT NOT NULL, resolved_at REAL NOT NULL)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS redirects_resolved ON redirects (resolved_at)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS purges (name TEXT PRIMARY KEY, purged_at REAL NOT NULL)")
+            row = self.conn.execute("SELECT purged_at FROM purges WHERE name = 'redirects'").fetchone()
+        if row is None or time.time() - row[0] >= purge_interval:
+            self.purge_expired()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT final_url, history FROM redirects WHERE url = ? AND resolved_at > ?",
+                (url, time.time() - self.ttl)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, url, final_url, history):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO redirects VALUES (?, ?, ?, ?)",
+                              (url, final_url, json.dumps(history), time.time()))
+
+    def purge_expired(self):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM redirects WHERE resolved_at <= ?", (now - self.ttl,))
+            self.conn.execute("INSERT OR REPLACE INTO purges VALUES ('redirects', ?)", (now,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class MatchResult:
+    __slots__ = ('source_url', 'matched_url', 'element', 'attribute', 'campaign', 'keyword', 
+                 'content', 'location_type', 'timestamp')
+
+    def __init__(self, source_url, matched_url, element, attribute, campaign, keyword, content, location_type, 
+                 timestamp):
+        self.source_url = source_url
+        self.matched_url = matched_url
+        self.element = element
+        self.attribute = attribute
+        self.campaign = campaign
+        self.keyword = keyword
+        self.content = content
+        self.location_type = location_type
+        self.timestamp = timestamp
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default) if field in self.__slots__ else default
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"MatchResult({self.to_dict()!r})"
+
+class ResultStore:
+    KEY_FIELDS = ('source_url', 'matched_url', 'campaign', 'keyword', 'location_type', 'element', 'attribute')
+
+    def __init__(self):
+        self.records = []
+        self.index = set()
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add(self, source_url, matched_url, element, attribute, campaign, keyword, content, location_type, 
+            timestamp=None):
+        key = (source_url, matched_url, campaign, keyword, location_type, element, attribute)
+        with self.lock:
+            if key in self.index:
+                return None
+            self.index.add(key)
+            record = MatchResult(source_url, matched_url, element, attribute, campaign, keyword, content, 
+                                 location_type, timestamp or datetime.datetime.now().isoformat())
+            self.records.append(record)
+        for listener in self.listeners:
+            listener(record)
+        return record
+
+    def __contains__(self, key):
+        if isinstance(key, MatchResult):
+            key = tuple(key[field] for field in self.KEY_FIELDS)
+        elif isinstance(key, dict):
+            key = tuple(key.get(field) for field in self.KEY_FIELDS)
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def close(self):
+        pass
+
+class SpillingResultStore(ResultStore):
+    def __init__(self, path, recent=50):
+        super().__init__()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.records = deque(maxlen=recent)
+        self.count = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS results")
+            self.conn.execute("""CREATE TABLE results (
+                seq INTEGER PRIMARY KEY, source_url TEXT, matched_url TEXT, element TEXT, attribute TEXT, 
+                campaign TEXT, keyword TEXT, content TEXT, location_type TEXT, timestamp TEXT, 
+                UNIQUE (source_url, matched_url, campaign, keyword, location_type, element, attribute))""")
+
+    def add(self, source_url, matched_url, element, attribute, campaign, keyword, content, location_type, 
+            timestamp=None):
+        record = MatchResult(source_url, matched_url, element, attribute, campaign, keyword, content, 
+                             location_type, timestamp or datetime.datetime.now().isoformat())
+        with self.lock, self.conn:
+            inserted = self.conn.execute(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                (self.count + 1, source_url, matched_url, element, attribute, campaign, keyword, content, 
+                 location_type, record.timestamp)).rowcount
+            if not inserted:
+                return None
+            self.count += 1
+            self.records.append(record)
+        for listener in self.listeners:
+            listener(record)
+        return record
+
+    def rows(self, start, stop):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT source_url, matched_url, element, attribute, campaign, keyword, content, location_type, "
+                "timestamp FROM results WHERE seq > ? AND seq <= ? ORDER BY seq", (start, stop)).fetchall()
+        return [MatchResult(*row) for row in rows]
+
+    def __contains__(self, key):
+        if isinstance(key, MatchResult):
+            key = tuple(key[field] for field in self.KEY_FIELDS)
+        elif isinstance(key, dict):
+            key = tuple(key.get(field) for field in self.KEY_FIELDS)
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM results WHERE source_url IS ? AND matched_url IS ? AND campaign IS ? AND keyword IS ? "
+                "AND location_type IS ? AND element IS ? AND attribute IS ?", key).fetchone() is not None
+
+    def __iter__(self):
+        for start in range(0, self.count, 1000):
+            yield from self.rows(start, start + 1000)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step != 1:
+                return self.rows(start, stop)[::step]
+            if start >= self.count - len(self.records):
+                recent = list(self.records)
+                offset = self.count - len(recent)
+                return recent[start - offset:stop - offset]
+            return self.rows(start, stop)
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("result index out of range")
+        return self.rows(index, index + 1)[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+class MatchChanges:
+    KINDS = ('new', 'gone', 'unchanged')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(self.KINDS, 0)
+        self.matches = {kind: [] for kind in self.KINDS}
+
+    def add(self, kind, match):
+        with self.lock:
+            self.counts[kind] += 1
+            self.matches[kind].append(match)
+
+    def count(self, kind):
+        return self.counts[kind]
+
+    def rows(self, kind, limit=None):
+        with self.lock:
+            return list(self.matches[kind][:limit])
+
+    def close(self):
+        pass
+
+class SpillingMatchChanges(MatchChanges):
+    def __init__(self, path):
+        super().__init__()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.matches = None
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("DROP TABLE IF EXISTS changes")
+            self.conn.execute("""CREATE TABLE changes (
+                kind TEXT, source_url TEXT, matched_url TEXT, element TEXT, attribute TEXT, campaign TEXT, 
+                keyword TEXT, content TEXT, location_type TEXT)""")
+
+    def add(self, kind, match):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (kind,) + tuple(match))
+            self.counts[kind] += 1
+
+    def rows(self, kind, limit=None):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT source_url, matched_url, element, attribute, campaign, keyword, content, location_type "
+                "FROM changes WHERE kind = ? ORDER BY rowid LIMIT ?", 
+                (kind, -1 if limit is None else limit)).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+class BloomFilter:
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        added = False
+        for position in self.positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+    def __len__(self):
+        return self.count
+
+class LRUCache:
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, self.writes)
+            self.entries.move_to_end(key)
+            self.writes += 1
+            if self.max_entries is not None:
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def items(self):
+        with self.lock:
+            return [(key, value) for key, (value, _) in self.entries.items()]
+
+    def items_since(self, write):
+        with self.lock:
+            return [(key, value) for key, (value, seq) in self.entries.items() if seq >= write]
+
+class StatusLog(deque):
+    def __init__(self, iterable=(), maxlen=None):
+        super().__init__(maxlen=maxlen)
+        self.errors = 0
+        self.listeners = []
+        self.extend(iterable)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def append(self, message):
+        if str(message).startswith('Error'):
+            self.errors += 1
+        super().append(message)
+        for listener in self.listeners:
+            listener(message)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+class MemoryBudget:
+    def __init__(self, url_capacity=1000000, false_positive_rate=0.001, max_pending=100000, 
+                 redirect_cache_size=10000, status_log_size=500, recent_results=50, 
+                 response_cache_bytes=32 * 1024 * 1024, spill_dir=os.path.join(CACHE_DIR, 'spill')):
+        self.url_capacity = url_capacity
+        self.false_positive_rate = false_positive_rate
+        self.max_pending = max_pending
+        self.redirect_cache_size = redirect_cache_size
+        self.status_log_size = status_log_size
+        self.recent_results = recent_results
+        self.response_cache_bytes = response_cache_bytes
+        self.spill_dir = spill_dir
+
+    def url_set(self, urls=()):
+        bloom = BloomFilter(self.url_capacity, self.false_positive_rate)
+        for url in urls:
+            bloom.add(url)
+        return bloom
+
+    def spill_path(self, name):
+        return os.path.join(self.spill_dir, f"{name}_{os.getpid()}_{threading.get_ident()}_{time.time_ns()}.sqlite")
+
+    def result_store(self):
+        return SpillingResultStore(self.spill_path('results'), recent=self.recent_results)
+
+    def match_changes(self):
+        return SpillingMatchChanges(self.spill_path('changes'))
+
+    def status_log(self):
+        return StatusLog(maxlen=self.status_log_size)
+
+class URLCanonicalizer:
+    TRACKING_PREFIXES = ('utm_',)
+    TRACKING_PARAMS = ('fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 
+                       'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi')
+    DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+    def __init__(self, drop_fragment=True, lowercase_host=True, strip_default_port=True, 
+                 strip_trailing_slash=True, strip_tracking_params=True, sort_query=True, 
+                 strip_www=False, lowercase_path=False, tracking_prefixes=TRACKING_PREFIXES, 
+                 tracking_params=TRACKING_PARAMS):
+        self.drop_fragment = drop_fragment
+        self.lowercase_host = lowercase_host
+        self.strip_default_port = strip_default_port
+        self.strip_trailing_slash = strip_trailing_slash
+        self.strip_tracking_params = strip_tracking_params
+        self.sort_query = sort_query
+        self.strip_www = strip_www
+        self.lowercase_path = lowercase_path
+        self.tracking_prefixes = tuple(tracking_prefixes)
+        self.tracking_params = set(tracking_params)
+
+    def is_tracking_param(self, name):
+        name = name.lower()
+        return name in self.tracking_params or name.startswith(self.tracking_prefixes)
+
+    def __call__(self, url):
+        try:
+            parts = urlsplit(url.strip())
+            scheme = parts.scheme.lower()
+            host = parts.hostname or ''
+            port = parts.port
+        except ValueError:
+            return url
+        if not self.lowercase_host:
+            host = parts.netloc.rsplit('@', 1)[-1].split(':')[0]
+        host = host.rstrip('.')
+        if self.strip_www and host.startswith('www.'):
+            host = host[4:]
+        netloc = host
+        if port and not (self.strip_default_port and self.DEFAULT_PORTS.get(scheme) == port):
+            netloc = f"{host}:{port}"
+        path = parts.path or '/'
+        if self.lowercase_path:
+            path = path.lower()
+        if self.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        query = parts.query
+        if query and (self.strip_tracking_params or self.sort_query):
+            params = parse_qsl(query, keep_blank_values=True)
+            if self.strip_tracking_params:
+                params = [(k, v) for k, v in params if not self.is_tracking_param(k)]
+            if self.sort_query:
+                params.sort()
+            query = urlencode(params)
+        fragment = '' if self.drop_fragment else parts.fragment
+        return urlunsplit((scheme, netloc, path, query, fragment))
+
+class FrontierPriority:
+    AFFILIATE_PATH_PATTERN = (r'/(?:travel|tours?|guides?|blog|deals?|recommend\w*|reviews?|'
+                              r'best|things-to-do|itinerar\w*|trips?|destinations?)(?:/|$|-)')
+
+    def __init__(self, depth_weight=1.0, affiliate_bonus=2.0, affiliate_path_pattern=AFFILIATE_PATH_PATTERN):
+        self.depth_weight = depth_weight
+        self.affiliate_bonus = affiliate_bonus
+        self.affiliate_path_regex = re.compile(affiliate_path_pattern, re.IGNORECASE) if affiliate_path_pattern else None
+
+    def __call__(self, url, depth):
+        score = depth * self.depth_weight
+        if self.affiliate_path_regex and self.affiliate_path_regex.search(urlparse(url).path):
+            score -= self.affiliate_bonus
+        return score
+
+class URLFrontier:
+    def __init__(self, canonicalize=None, priority=None, memory_budget=None):
+        self.canonicalize = canonicalize or URLCanonicalizer()
+        self.priority = priority or FrontierPriority()
+        self.memory_budget = memory_budget
+        self.max_pending = memory_budget.max_pending if memory_budget else None
+        self.heap = []
+        self.seen = self.url_set()
+        self.visited = self.url_set()
+        self.visited_log = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def url_set(self, urls=()):
+        if self.memory_budget is None:
+            return set(urls)
+        return self.memory_budget.url_set(urls)
+
+    def push(self, url, depth=0):
+        if not url:
+            return False
+        canonical = self.canonicalize(url)
+        with self.lock:
+            if canonical in self.seen:
+                return False
+            self.seen.add(canonical)
+            heapq.heappush(self.heap, (self.priority(url, depth), next(self.counter), url.split('#', 1)[0], depth))
+            if self.max_pending is not None and len(self.heap) > 2 * self.max_pending:
+                self.heap = heapq.nsmallest(self.max_pending, self.heap)
+                heapq.heapify(self.heap)
+            return True
+
+    def pop(self):
+        with self.lock:
+            while self.heap:
+                _, _, url, depth = heapq.heappop(self.heap)
+                if self.canonicalize(url) not in self.visited:
+                    return url, depth
+            return None
+
+    def mark_visited(self, url):
+        canonical = self.canonicalize(url)
+        with self.lock:
+            if canonical in self.visited:
+                return False
+            self.visited.add(canonical)
+            if self.visited_log is not None:
+                self.visited_log.append(canonical)
+            self.seen.add(canonical)
+            return True
+
+    def drain_visited_log(self, held=()):
+        with self.lock:
+            drained = self.visited_log or []
+            if self.visited_log is not None:
+                self.visited_log = [url for url in drained if url in held]
+            return [url for url in drained if url not in held]
+
+    def pending(self):
+        with self.lock:
+            return [(url, depth) for _, _, url, depth in sorted(self.heap)]
+
+    def restore(self, visited, pending):
+        with self.lock:
+            self.heap = []
+            self.visited = self.url_set(visited)
+            self.seen = self.url_set(visited)
+        for url, depth in pending:
+            self.push(url, depth)
+
+    def is_visited(self, url):
+        return self.canonicalize(url) in self.visited
+
+    def __contains__(self, url):
+        return self.canonicalize(url) in self.seen
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+class PageExtraction:
+    __slots__ = ('texts', 'links', 'scripts', 'script_urls')
+
+    def __init__(self):
+        self.texts = []
+        self.links = []
+        self.scripts = []
+        self.script_urls = []
+
+class DomExtractor:
+    CONTENT_TAGS = frozenset(['p', 'div', 'span', 'title', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    HREF_TAGS = frozenset(['a', 'div', 'section', 'title', 'main', 'article', 'span', 'p', 'img', 'meta', 
+                           'iframe', 'script'])
+    INLINE_TAGS = frozenset(['span'])
+    SKIP_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+    BACKENDS = ('bs4', 'lxml')
+
+    def __init__(self, backend="bs4", metrics=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown parser backend: {backend}")
+        self.backend = backend
+        self.metrics = metrics
+
+    @contextmanager
+    def timed(self, stage):
+        if self.metrics is None:
+            yield
+        else:
+            with self.metrics.time(stage):
+                yield
+
+    def extract(self, markup, source_url, encoding=None):
+        if self.backend == 'lxml':
+            return self.extract_lxml(markup, source_url, encoding)
+        return self.extract_bs4(markup, source_url, encoding)
+
+    def open_element(self, extraction, segments, name, attrs, parent_ctx, source_url):
+        container, anchor = parent_ctx
+        href = attrs.get('href') if name in self.HREF_TAGS else None
+        if isinstance(href, str) and href.strip():
+            resolved_url = urljoin(source_url, href.strip())
+            extraction.links.append(resolved_url)
+            anchor = [resolved_url, name, 'text', [], 'anchor_text', None]
+            segments.append(anchor)
+            if container is not None:
+                container[3].append(anchor)
+        elif name in self.CONTENT_TAGS and not (name in self.INLINE_TAGS and container is not None):
+            # Inline containers stay part of the enclosing text; block containers get their own
+            # segment, which finish() folds into an enclosing container that has text of its own.
+            outer = container
+            container = [source_url, name, 'text', [], 'content', outer]
+            segments.append(container)
+            if outer is not None:
+                outer[3].append(container)
+        if name == 'img' and attrs.get('alt'):
+            alt_text = attrs['alt'].strip()
+            if anchor is not None and anchor[1] == 'a':
+                extraction.texts.append((anchor[0], 'a', 'img_alt', alt_text, 'image_banner'))
+            else:
+                extraction.texts.append((source_url, name, 'alt', alt_text, 'alt_text'))
+        if name == 'script' and isinstance(attrs.get('src'), str) and attrs['src'].strip():
+            extraction.script_urls.append(urljoin(source_url, attrs['src'].strip()))
+        if name == 'meta' and attrs.get('content'):
+            attr_name = attrs.get('name') or attrs.get('property') or 'meta'
+            extraction.texts.append((source_url, name, attr_name, attrs['content'].strip(), 'meta'))
+        for attr, value in attrs.items():
+            if attr.startswith('data-') and isinstance(value, str):
+                if 'url' in attr.lower() or 'href' in attr.lower():
+                    data_url = value.strip()
+                    if data_url:
+                        extraction.links.append(data_url)
+        return container, anchor
+
+    def add_text(self, ctx, text):
+        container, anchor = ctx
+        owner = anchor if anchor is not None else container
+        if owner is not None:
+            text = text.strip()
+            if text:
+                owner[3].append(text)
+
+    @staticmethod
+    def has_text(segment):
+        return any(isinstance(piece, str) for piece in segment[3])
+
+    def flatten(self, pieces, strings):
+        for piece in pieces:
+            if isinstance(piece, str):
+                strings.append(piece)
+            else:
+                self.flatten(piece[3], strings)
+        return strings
+
+    def finish(self, extraction, segments):
+        for segment in segments:
+            matched_url, name, attribute, pieces, location_type, outer = segment
+            if location_type == 'content':
+                if not self.has_text(segment):
+                    continue
+                while outer is not None and not self.has_text(outer):
+                    outer = outer[5]
+                if outer is not None:
+                    continue
+            strings = self.flatten(pieces, [])
+            if strings:
+                extraction.texts.append((matched_url, name, attribute, ' '.join(strings), location_type))
+        return extraction
+
+    def extract_bs4(self, markup, source_url, encoding=None):
+        with self.timed('html_parse'):
+            if isinstance(markup, bytes):
+                soup = BeautifulSoup(markup, 'lxml', from_encoding=encoding)
+            else:
+                soup = BeautifulSoup(markup, 'lxml')
+        with self.timed('element_scan'):
+            return self.walk_bs4(soup, source_url)
+
+    def walk_bs4(self, soup, source_url):
+        extraction = PageExtraction()
+        segments = []
+        contexts = {id(soup): (None, None)}
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                ctx = self.open_element(extraction, segments, node.name, node.attrs, 
+                                        contexts[id(node.parent)], source_url)
+                contexts[id(node)] = ctx
+                if node.name == 'script' and node.string:
+                    extraction.scripts.append(str(node.string))
+            elif type(node) in (NavigableString, CData):
+                if node.parent.name not in self.SKIP_TEXT_TAGS:
+                    self.add_text(contexts[id(node.parent)], node)
+        return self.finish(extraction, segments)
+
+    def extract_lxml(self, markup, source_url, encoding=None):
+        with self.timed('html_parse'):
+            if isinstance(markup, bytes):
+                parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+                root = lxml.html.document_fromstring(markup, parser=parser)
+            else:
+                root = lxml.html.document_fromstring(markup)
+        with self.timed('element_scan'):
+            return self.walk_lxml(root, source_url)
+
+    def walk_lxml(self, root, source_url):
+        extraction = PageExtraction()
+        segments = []
+        contexts = {None: (None, None)}
+        for event, node in lxml.etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+            parent = node.getparent()
+            if event == 'start':
+                name = node.tag.lower()
+                ctx = self.open_element(extraction, segments, name, node.attrib, contexts[parent], source_url)
+                contexts[node] = ctx
+                if name == 'script':
+                    if node.text:
+                        extraction.scripts.append(node.text)
+                elif node.text and name not in self.SKIP_TEXT_TAGS:
+                    self.add_text(ctx, node.text)
+                continue
+            if node.tail and parent is not None and parent.tag not in self.SKIP_TEXT_TAGS:
+                self.add_text(contexts[parent], node.tail)
+        return self.finish(extraction, segments)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+SNIFF_BYTES = 64 * 1024
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+def charset_from_headers(headers):
+    match = re.search(r'charset=["\']?([\w.:-]+)', headers.get('Content-Type', ''), re.IGNORECASE)
+    return match.group(1) if match else None
+
+def known_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+def sniff_encoding(content, headers):
+    declared = charset_from_headers(headers)
+    if declared and known_codec(declared):
+        return declared
+    match = META_CHARSET_RE.search(content[:4096])
+    if match and known_codec(match.group(1).decode('ascii', 'ignore')):
+        return match.group(1).decode('ascii')
+    if not content:
+        return None
+    # A prefix is enough to tell UTF-8 from a legacy charset; final=False tolerates a character
+    # cut in half where a longer body is truncated.
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(content[:SNIFF_BYTES], final=len(content) <= SNIFF_BYTES)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
+
+class ResponseRejected(Exception):
+    pass
+
+class CachedResponse:
+    __slots__ = ('url', 'status_code', 'headers', 'content', 'encoding', 'fetched_at', 
+                 'expires_at', 'from_cache')
+
+    def __init__(self, url, status_code, headers, content, fetched_at=None, expires_at=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = sniff_encoding(content, self.headers)
+        self.fetched_at = fetched_at or time.time()
+        self.expires_at = expires_at if expires_at is not None else self.freshness_deadline()
+        self.from_cache = False
+
+    @classmethod
+    def from_response(cls, response, content=None):
+        return cls(response.url, response.status_code, dict(response.headers), 
+                   response.content if content is None else content)
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+    def cache_control(self):
+        directives = {}
+        for part in self.headers.get('Cache-Control', '').split(','):
+            name, _, value = part.strip().partition('=')
+            if name:
+                directives[name.lower()] = value.strip('"')
+        return directives
+
+    def cacheable(self):
+        return self.status_code == 200 and 'no-store' not in self.cache_control()
+
+    def freshness_deadline(self):
+        directives = self.cache_control()
+        if 'no-cache' in directives:
+            return self.fetched_at
+        for name in ('s-maxage', 'max-age'):
+            if name in directives:
+                try:
+                    return self.fetched_at + int(directives[name])
+                except ValueError:
+                    return self.fetched_at
+        expires = self.headers.get('Expires')
+        if expires:
+            try:
+                return email.utils.parsedate_to_datetime(expires).timestamp()
+            except (TypeError, ValueError):
+                return self.fetched_at
+        return self.fetched_at
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires_at
+
+    def validators(self):
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def revalidated(self, not_modified):
+        for name in ('Cache-Control', 'Expires', 'ETag', 'Last-Modified', 'Date'):
+            if name in not_modified.headers:
+                self.headers[name] = not_modified.headers[name]
+        self.fetched_at = time.time()
+        self.expires_at = self.freshness_deadline()
+        return self
+
+class ResponseCache:
+    def __init__(self, max_entries=256, disk_path=None, max_disk_bytes=256 * 1024 * 1024, max_memory_bytes=None):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_bytes = 0
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.conn = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self.conn = sqlite3.connect(disk_path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            with self.conn:
+                self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY, final_url TEXT NOT NULL, status_code INTEGER NOT NULL, 
+                    headers TEXT NOT NULL, content BLOB NOT NULL, fetched_at REAL NOT NULL, 
+                    expires_at REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0)""")
+                columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+                if 'size' not in columns:
+                    self.conn.execute("ALTER TABLE responses ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                    self.conn.execute("UPDATE responses SET size = length(content) + length(headers)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS responses_fetched ON responses (fetched_at)")
+            with self.lock, self.conn:
+                self.prune()
+
+    def get(self, url):
+        with self.lock:
+            entry = self.memory.get(url)
+            if entry is not None:
+                self.memory.move_to_end(url)
+                return entry
+            if self.conn is None:
+                return None
+            row = self.conn.execute(
+                "SELECT final_url, status_code, headers, content, fetched_at, expires_at "
+                "FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        entry = CachedResponse(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5])
+        self.remember(url, entry)
+        return entry
+
+    def remember(self, url, entry):
+        with self.lock:
+            replaced = self.memory.pop(url, None)
+            if replaced is not None:
+                self.memory_bytes -= len(replaced.content)
+            self.memory[url] = entry
+            self.memory_bytes += len(entry.content)
+            while self.memory and (len(self.memory) > self.max_entries or 
+                                   (self.max_memory_bytes is not None and self.memory_bytes > self.max_memory_bytes)):
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= len(evicted.content)
+
+    def put(self, url, entry):
+        if not entry.cacheable():
+            return
+        self.remember(url, entry)
+        if self.conn is None:
+            return
+        headers = json.dumps(dict(entry.headers))
+        size = len(entry.content) + len(headers)
+        if self.max_disk_bytes and size > self.max_disk_bytes:
+            return
+        with self.lock, self.conn:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses (url, final_url, status_code, headers, content, "
+                              "fetched_at, expires_at, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", 
+                              (url, entry.url, entry.status_code, headers, entry.content, entry.fetched_at, 
+                               entry.expires_at, size))
+            self.disk_bytes += size - (replaced[0] if replaced else 0)
+            if self.max_disk_bytes and self.disk_bytes > self.max_disk_bytes:
+                self.prune()
+
+    def prune(self):
+        # Other processes may share the file, so recount before evicting the oldest responses
+        # down to 80% of the limit, leaving room for a while before the next prune.
+        self.disk_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if not self.max_disk_bytes or self.disk_bytes <= self.max_disk_bytes:
+            return
+        target = self.max_disk_bytes * 0.8
+        evicted = []
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY fetched_at"):
+            if self.disk_bytes <= target:
+                break
+            evicted.append((url,))
+            self.disk_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+
+class CrawlCheckpoint:
+    def __init__(self, path=os.path.join(CACHE_DIR, 'checkpoints.sqlite')):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]
+            if columns and 'campaign' not in columns:
+                # Checkpoints from before campaign tagging cannot be resumed without losing their results.
+                self.conn.executescript("""
+                    DROP TABLE results; DROP TABLE IF EXISTS crawls; DROP TABLE IF EXISTS frontier; 
+                    DROP TABLE IF EXISTS visited; DROP TABLE IF EXISTS redirects;
+                """)
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS crawls (
+                    crawl_key TEXT PRIMARY KEY, start_url TEXT NOT NULL, crawl_mode TEXT NOT NULL, 
+                    pages_crawled INTEGER NOT NULL, complete INTEGER NOT NULL, updated_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS frontier (
+                    crawl_key TEXT NOT NULL, seq INTEGER NOT NULL, url TEXT NOT NULL, depth INTEGER NOT NULL, 
+                    PRIMARY KEY (crawl_key, seq));
+                CREATE TABLE IF NOT EXISTS visited (
+                    crawl_key TEXT NOT NULL, url TEXT NOT NULL, PRIMARY KEY (crawl_key, url));
+                CREATE TABLE IF NOT EXISTS results (
+                    crawl_key TEXT NOT NULL, source_url TEXT, matched_url TEXT, element TEXT, 
+                    attribute TEXT, campaign TEXT, keyword TEXT, content TEXT, location_type TEXT, timestamp TEXT, 
+                    PRIMARY KEY (crawl_key, source_url, matched_url, campaign, keyword, location_type, element, 
+                                 attribute));
+                CREATE TABLE IF NOT EXISTS redirects (
+                    crawl_key TEXT NOT NULL, url TEXT NOT NULL, final_url TEXT NOT NULL, history TEXT NOT NULL, 
+                    PRIMARY KEY (crawl_key, url));
+            """)
+
+    @staticmethod
+    def crawl_key(start_url, crawl_mode):
+        return f"{crawl_mode}:{URLCanonicalizer()(start_url)}"
+
+    def find(self, start_url, crawl_mode):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT pages_crawled, complete, updated_at FROM crawls WHERE crawl_key = ?", 
+                (self.crawl_key(start_url, crawl_mode),)).fetchone()
+        if row is None:
+            return None
+        return {'pages_crawled': row[0], 'complete': bool(row[1]), 'updated_at': row[2]}
+
+    def save(self, crawler, complete=False):
+        key = self.crawl_key(crawler.start_url, crawler.crawl_mode)
+        saved = crawler.checkpoint_saved
+        # Pages still being crawled have not saved their outlinks yet, so they go back to the
+        # frontier and stay out of the visited set until a later save.
+        with crawler.lock:
+            in_flight = dict(crawler.in_flight)
+            pages_crawled = crawler.pages_crawled - len(in_flight)
+            visited = crawler.frontier.drain_visited_log({crawler.frontier.canonicalize(url) for url in in_flight})
+        results = crawler.results[saved['results']:]
+        redirect_writes = crawler.redirect_cache.writes
+        redirects = crawler.redirect_cache.items_since(saved['redirects'])
+        interrupted = list(crawler.interrupted)
+        pending = [(url, 0) for url in interrupted] + list(in_flight.items()) + crawler.frontier.pending()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO crawls VALUES (?, ?, ?, ?, ?, ?)", 
+                              (key, crawler.start_url, crawler.crawl_mode, pages_crawled, 
+                               int(complete), time.time()))
+            self.conn.execute("DELETE FROM frontier WHERE crawl_key = ?", (key,))
+            self.conn.executemany("INSERT INTO frontier VALUES (?, ?, ?, ?)", 
+                                  ((key, seq, url, depth) for seq, (url, depth) in enumerate(pending)))
+            self.conn.executemany("INSERT OR IGNORE INTO visited VALUES (?, ?)", 
+                                  ((key, url) for url in visited))
+            self.conn.executemany("DELETE FROM visited WHERE crawl_key = ? AND url = ?", 
+                                  ((key, crawler.frontier.canonicalize(url)) for url in interrupted))
+            self.conn.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                                  ((key, r.source_url, r.matched_url, r.element, r.attribute, r.campaign, 
+                                    r.keyword, r.content, r.location_type, r.timestamp) for r in results))
+            self.conn.executemany("INSERT OR REPLACE INTO redirects VALUES (?, ?, ?, ?)", 
+                                  ((key, url, final_url, json.dumps(history)) 
+                                   for url, (final_url, history) in redirects))
+        saved['results'] += len(results)
+        saved['redirects'] = redirect_writes
+
+    def restore(self, crawler):
+        key = self.crawl_key(crawler.start_url, crawler.crawl_mode)
+        with self.lock:
+            row = self.conn.execute("SELECT pages_crawled FROM crawls WHERE crawl_key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            visited = [r[0] for r in self.conn.execute("SELECT url FROM visited WHERE crawl_key = ?", (key,))]
+            pending = self.conn.execute(
+                "SELECT url, depth FROM frontier WHERE crawl_key = ? ORDER BY seq", (key,)).fetchall()
+            results = self.conn.execute(
+                "SELECT source_url, matched_url, element, attribute, campaign, keyword, content, location_type, "
+                "timestamp FROM results WHERE crawl_key = ? ORDER BY rowid", (key,)).fetchall()
+            redirects = self.conn.execute(
+                "SELECT url, final_url, history FROM redirects WHERE crawl_key = ?", (key,)).fetchall()
+        crawler.pages_crawled = row[0]
+        crawler.frontier.restore(visited, pending)
+        for result in results:
+            crawler.results.add(*result)
+        for url, final_url, history in redirects:
+            crawler.redirect_cache[url] = (final_url, json.loads(history))
+        crawler.checkpoint_saved = {'results': len(crawler.results), 
+                                    'redirects': crawler.redirect_cache.writes}
+        return True
+
+    def discard(self, start_url, crawl_mode):
+        key = self.crawl_key(start_url, crawl_mode)
+        with self.lock, self.conn:
+            for table in ('crawls', 'frontier', 'visited', 'results', 'redirects'):
+                self.conn.execute(f"DELETE FROM {table} WHERE crawl_key = ?", (key,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class PageStateStore:
+    def __init__(self, path=os.path.join(CACHE_DIR, 'pages.sqlite')):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY, final_url TEXT NOT NULL, content_hash TEXT NOT NULL, 
+                etag TEXT, last_modified TEXT, matches TEXT NOT NULL, outlinks TEXT NOT NULL, 
+                crawled_at REAL NOT NULL, campaigns TEXT)""")
+            if 'campaigns' not in [row[1] for row in self.conn.execute("PRAGMA table_info(pages)")]:
+                self.conn.execute("ALTER TABLE pages ADD COLUMN campaigns TEXT")
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT final_url, content_hash, etag, last_modified, matches, outlinks, crawled_at, campaigns "
+                "FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'final_url': row[0],
+            'content_hash': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+            'matches': [tuple(match) for match in json.loads(row[4])],
+            'outlinks': json.loads(row[5]),
+            'crawled_at': row[6],
+            'campaigns': row[7]
+        }
+
+    def put(self, url, final_url, content_hash, etag, last_modified, matches, outlinks, campaigns=None):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                              (url, final_url, content_hash, etag, last_modified, 
+                               json.dumps(matches), json.dumps(outlinks), time.time(), campaigns))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def to_epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time()).timestamp()
+    return datetime.datetime.fromisoformat(str(value)).timestamp()
+
+def site_domain(url):
+    host = (urlparse(url).hostname or '').lower() if url else ''
+    return host[4:] if host.startswith('www.') else host
+
+class MatchIndex:
+    FACETS = ('campaign', 'keyword', 'location_type')
+    # Filters the per-day rollup can answer on its own; anything else reads the matches table.
+    ROLLUP_FILTERS = ('campaign', 'keyword', 'source_domain')
+    MATCH_FIELDS = ('crawl_id', 'crawled_at', 'source_domain', 'source_url', 'matched_url', 'matched_domain', 
+                    'campaign', 'keyword', 'location_type', 'element', 'attribute', 'content', 'timestamp')
+
+    def __init__(self, path=os.path.join(CACHE_DIR, 'matches.sqlite')):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS crawls (
+                    id INTEGER PRIMARY KEY, start_url TEXT NOT NULL, source_domain TEXT NOT NULL, 
+                    crawl_mode TEXT NOT NULL, started_at REAL NOT NULL, finished_at REAL, pages INTEGER, 
+                    matches INTEGER);
+                CREATE TABLE IF NOT EXISTS matches (
+                    id INTEGER PRIMARY KEY, crawl_id INTEGER NOT NULL, crawled_at REAL NOT NULL, 
+                    source_domain TEXT NOT NULL, source_url TEXT, matched_url TEXT, matched_domain TEXT, 
+                    campaign TEXT, keyword TEXT, location_type TEXT, element TEXT, attribute TEXT, 
+                    content TEXT, timestamp TEXT);
+                CREATE INDEX IF NOT EXISTS matches_crawled_at ON matches (crawled_at, source_domain);
+                CREATE INDEX IF NOT EXISTS matches_crawl ON matches (crawl_id);
+                CREATE INDEX IF NOT EXISTS matches_keyword ON matches (keyword, crawled_at);
+                CREATE INDEX IF NOT EXISTS matches_campaign ON matches (campaign, crawled_at);
+                CREATE INDEX IF NOT EXISTS matches_source_domain ON matches (source_domain, crawled_at);
+                CREATE INDEX IF NOT EXISTS matches_matched_domain ON matches (matched_domain, crawled_at);
+                CREATE INDEX IF NOT EXISTS matches_matched_url ON matches (matched_url, crawled_at);
+                CREATE INDEX IF NOT EXISTS matches_location_type ON matches (location_type, crawled_at, source_domain);
+                CREATE TABLE IF NOT EXISTS daily_site_matches (
+                    day TEXT NOT NULL, source_domain TEXT NOT NULL, campaign TEXT NOT NULL, keyword TEXT NOT NULL, 
+                    matches INTEGER NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL, 
+                    PRIMARY KEY (day, source_domain, campaign, keyword)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS daily_site_matches_keyword 
+                    ON daily_site_matches (keyword, day, source_domain, matches, first_seen, last_seen);
+                CREATE INDEX IF NOT EXISTS daily_site_matches_campaign 
+                    ON daily_site_matches (campaign, day, source_domain, matches, first_seen, last_seen);
+                CREATE INDEX IF NOT EXISTS daily_site_matches_domain ON daily_site_matches (source_domain, day);
+                CREATE TABLE IF NOT EXISTS facets (
+                    field TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (field, value)) WITHOUT ROWID;
+            """)
+            try:
+                self.conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS matches_fts USING fts5(
+                        content, content='matches', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS matches_fts_insert AFTER INSERT ON matches BEGIN
+                        INSERT INTO matches_fts (rowid, content) VALUES (new.id, new.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS matches_fts_delete AFTER DELETE ON matches BEGIN
+                        INSERT INTO matches_fts (matches_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                    END;
+                """)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: content search falls back to a LIKE scan.
+                self.fts = False
+
+    def start_crawl(self, start_url, crawl_mode, started_at=None):
+        with self.lock, self.conn:
+            return self.conn.execute(
+                "INSERT INTO crawls (start_url, source_domain, crawl_mode, started_at) VALUES (?, ?, ?, ?)", 
+                (start_url, site_domain(start_url), crawl_mode, started_at or time.time())).lastrowid
+
+    def finish_crawl(self, crawl_id, pages, matches):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE crawls SET finished_at = ?, pages = ?, matches = ? WHERE id = ?", 
+                              (time.time(), pages, matches, crawl_id))
+
+    def add(self, crawl_id, records):
+        if not records:
+            return 0
+        with self.lock:
+            crawled_at = self.conn.execute("SELECT started_at FROM crawls WHERE id = ?", (crawl_id,)).fetchone()[0]
+        day = datetime.date.fromtimestamp(crawled_at).isoformat()
+        rows = []
+        rollup = {}
+        facets = set()
+        for r in records:
+            source_domain = site_domain(r['source_url'])
+            rows.append((crawl_id, crawled_at, source_domain, r['source_url'], r['matched_url'], 
+                         site_domain(r['matched_url']), r['campaign'], r['keyword'], r['location_type'], 
+                         r['element'], r['attribute'], r['content'], r['timestamp']))
+            key = (day, source_domain, r['campaign'] or '', r['keyword'] or '')
+            rollup[key] = rollup.get(key, 0) + 1
+            facets.update((field, r[field]) for field in self.FACETS if r[field])
+        with self.lock, self.conn:
+            self.conn.executemany(f"INSERT INTO matches ({', '.join(self.MATCH_FIELDS)}) "
+                                  f"VALUES ({', '.join('?' * len(self.MATCH_FIELDS))})", rows)
+            self.conn.executemany(
+                "INSERT INTO daily_site_matches VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                "matches = matches + excluded.matches, first_seen = min(first_seen, excluded.first_seen), "
+                "last_seen = max(last_seen, excluded.last_seen)", 
+                ((*key, count, crawled_at, crawled_at) for key, count in rollup.items()))
+            self.conn.executemany("INSERT OR IGNORE INTO facets VALUES (?, ?)", facets)
+        return len(rows)
+
+    def where(self, keyword=None, campaign=None, source_domain=None, matched_domain=None, matched_url=None, 
+              location_type=None, since=None, until=None, text=None, crawl_id=None):
+        clauses = []
+        params = []
+        for column, value in (('keyword', keyword), ('campaign', campaign), ('location_type', location_type), 
+                              ('crawl_id', crawl_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        for column, value in (('source_domain', source_domain), ('matched_domain', matched_domain)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(site_domain(value if '://' in value else f'http://{value}'))
+        if matched_url:
+            # A prefix range keeps the matched_url index usable, unlike LIKE.
+            clauses.append("matched_url >= ? AND matched_url < ?")
+            params.extend([matched_url, matched_url + '\U0010ffff'])
+        if since is not None:
+            clauses.append("crawled_at >= ?")
+            params.append(to_epoch(since))
+        if until is not None:
+            clauses.append("crawled_at < ?")
+            params.append(to_epoch(until))
+        if text:
+            if self.fts:
+                terms = ' '.join('"' + term.replace('"', '""') + '"' for term in text.split())
+                clauses.append("id IN (SELECT rowid FROM matches_fts WHERE matches_fts MATCH ?)")
+                params.append(terms)
+            else:
+                clauses.append("content LIKE ?")
+                params.append(f"%{text}%")
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def rollup_where(self, filters):
+        # The rollup has day resolution, so it only answers time filters that fall on midnight.
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if value is None or value == '':
+                continue
+            if field in self.ROLLUP_FILTERS:
+                if field == 'source_domain':
+                    value = site_domain(value if '://' in value else f'http://{value}')
+                clauses.append(f"{field} = ?")
+                params.append(value)
+            elif field in ('since', 'until'):
+                moment = datetime.datetime.fromtimestamp(to_epoch(value))
+                if moment.time() != datetime.time():
+                    return None
+                clauses.append("day >= ?" if field == 'since' else "day < ?")
+                params.append(moment.date().isoformat())
+            else:
+                return None
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, limit=100, offset=0, **filters):
+        where, params = self.where(**filters)
+        # Page through ids first so broad filters sort index entries rather than whole rows.
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.MATCH_FIELDS)} FROM matches WHERE id IN ("
+                f"SELECT id FROM matches{where} ORDER BY crawled_at DESC, id DESC LIMIT ? OFFSET ?) "
+                "ORDER BY crawled_at DESC, id DESC", (*params, limit, offset)).fetchall()
+        matches = []
+        for row in rows:
+            match = dict(zip(self.MATCH_FIELDS, row))
+            match['crawled_at'] = datetime.datetime.fromtimestamp(match['crawled_at']).isoformat(timespec='seconds')
+            matches.append(match)
+        return matches
+
+    def count(self, **filters):
+        rollup = self.rollup_where(filters)
+        with self.lock:
+            if rollup is not None:
+                where, params = rollup
+                return self.conn.execute(f"SELECT COALESCE(SUM(matches), 0) FROM daily_site_matches{where}", 
+                                         params).fetchone()[0]
+            where, params = self.where(**filters)
+            return self.conn.execute(f"SELECT COUNT(*) FROM matches{where}", params).fetchone()[0]
+
+    def sites(self, limit=100, **filters):
+        rollup = self.rollup_where(filters)
+        if rollup is not None:
+            where, params = rollup
+            sql = (f"SELECT source_domain, SUM(matches), MIN(first_seen), MAX(last_seen) FROM daily_site_matches{where} "
+                   "GROUP BY source_domain ORDER BY MAX(last_seen) DESC, source_domain LIMIT ?")
+        else:
+            where, params = self.where(**filters)
+            sql = (f"SELECT source_domain, COUNT(*), MIN(crawled_at), MAX(crawled_at) FROM matches{where} "
+                   "GROUP BY source_domain ORDER BY MAX(crawled_at) DESC, source_domain LIMIT ?")
+        with self.lock:
+            rows = self.conn.execute(sql, (*params, limit)).fetchall()
+        return [{
+            'source_domain': domain,
+            'matches': matches,
+            'first_seen': datetime.datetime.fromtimestamp(first_seen).isoformat(timespec='seconds'),
+            'last_seen': datetime.datetime.fromtimestamp(last_seen).isoformat(timespec='seconds')
+        } for domain, matches, first_seen, last_seen in rows]
+
+    def facet(self, field):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT value FROM facets WHERE field = ? ORDER BY value", 
+                                                        (field,))]
+
+    def crawls(self, limit=50):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, start_url, crawl_mode, started_at, finished_at, pages, matches FROM crawls "
+                "ORDER BY started_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{
+            'id': crawl_id,
+            'start_url': start_url,
+            'crawl_mode': crawl_mode,
+            'started_at': datetime.datetime.fromtimestamp(started_at).isoformat(timespec='seconds'),
+            'finished_at': datetime.datetime.fromtimestamp(finished_at).isoformat(timespec='seconds') if finished_at else None,
+            'pages': pages,
+            'matches': matches
+        } for crawl_id, start_url, crawl_mode, started_at, finished_at, pages, matches in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class SharedFrontier:
+    # URL states in the frontier_urls table.
+    PENDING, LEASED, DONE = 0, 1, 2
+
+    def __init__(self, start_url, crawl_mode="Complete", path=os.path.join(CACHE_DIR, 'frontier.sqlite'), 
+                 max_pages=None, shards=16, lease_seconds=120, canonicalize=None, priority=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.start_url = start_url
+        self.crawl_key = CrawlCheckpoint.crawl_key(start_url, crawl_mode)
+        self.max_pages = max_pages
+        self.shards = shards
+        self.lease_seconds = lease_seconds
+        self.canonicalize = canonicalize or URLCanonicalizer()
+        self.priority = priority or FrontierPriority()
+        self.reclaimed = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS frontier_crawls (
+                crawl_key TEXT PRIMARY KEY, start_url TEXT NOT NULL, max_pages INTEGER, 
+                claimed INTEGER NOT NULL, seeded INTEGER NOT NULL, created_at REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS frontier_urls (
+                crawl_key TEXT NOT NULL, canonical TEXT NOT NULL, url TEXT NOT NULL, depth INTEGER NOT NULL, 
+                priority REAL NOT NULL, shard INTEGER NOT NULL, state INTEGER NOT NULL, owner TEXT, 
+                lease_expires REAL, PRIMARY KEY (crawl_key, canonical))""")
+            conn.execute("""CREATE INDEX IF NOT EXISTS frontier_urls_state 
+                ON frontier_urls (crawl_key, state, priority)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS frontier_results (
+                crawl_key TEXT NOT NULL, source_url TEXT, matched_url TEXT, element TEXT, attribute TEXT, 
+                campaign TEXT, keyword TEXT, content TEXT, location_type TEXT, timestamp TEXT, 
+                PRIMARY KEY (crawl_key, source_url, matched_url, campaign, keyword, location_type, element, 
+                             attribute))""")
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers queue on the busy 
+        # timeout instead of failing to upgrade a read transaction.
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def shard_of(self, canonical):
+        return int(hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:8], 16) % self.shards
+
+    def open(self, max_pages=None):
+        # Returns True for the one worker that should seed the crawl: whoever created it, or anyone 
+        # once the creator has failed to finish seeding within a lease period.
+        now = time.time()
+        with self.transaction() as conn:
+            created = conn.execute("INSERT OR IGNORE INTO frontier_crawls VALUES (?, ?, ?, 0, 0, ?)", 
+                                   (self.crawl_key, self.start_url, self.max_pages or max_pages, now)).rowcount
+            if not created:
+                created = conn.execute("UPDATE frontier_crawls SET created_at = ? WHERE crawl_key = ? "
+                                       "AND seeded = 0 AND created_at < ?", 
+                                       (now, self.crawl_key, now - self.lease_seconds)).rowcount
+            self.max_pages = conn.execute("SELECT max_pages FROM frontier_crawls WHERE crawl_key = ?", 
+                                          (self.crawl_key,)).fetchone()[0]
+        return bool(created)
+
+    def seed(self, urls):
+        pushed = self.push(urls, 0)
+        with self.transaction() as conn:
+            conn.execute("UPDATE frontier_crawls SET seeded = 1 WHERE crawl_key = ?", (self.crawl_key,))
+        return pushed
+
+    def rows_for(self, urls, depth):
+        rows = {}
+        for url in urls:
+            if not url:
+                continue
+            url = url.split('#', 1)[0]
+            canonical = self.canonicalize(url)
+            if canonical not in rows:
+                rows[canonical] = (self.crawl_key, canonical, url, depth, self.priority(url, depth), 
+                                   self.shard_of(canonical), self.PENDING, None, None)
+        return list(rows.values())
+
+    def push(self, urls, depth=0):
+        rows = self.rows_for(urls, depth)
+        with self.transaction() as conn:
+            return conn.executemany("INSERT OR IGNORE INTO frontier_urls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                                    rows).rowcount
+
+    def lease(self, owner, limit, shards=None):
+        now = time.time()
+        with self.transaction() as conn:
+            expired = conn.execute(
+                "UPDATE frontier_urls SET state = ?, owner = NULL, lease_expires = NULL "
+                "WHERE crawl_key = ? AND state = ? AND lease_expires < ?", 
+                (self.PENDING, self.crawl_key, self.LEASED, now)).rowcount
+            if expired:
+                self.reclaimed += expired
+                conn.execute("UPDATE frontier_crawls SET claimed = claimed - ? WHERE crawl_key = ?", 
+                             (expired, self.crawl_key))
+            if self.max_pages is not None:
+                claimed = conn.execute("SELECT claimed FROM frontier_crawls WHERE crawl_key = ?", 
+                                       (self.crawl_key,)).fetchone()[0]
+                limit = min(limit, self.max_pages - claimed)
+            if limit <= 0:
+                return []
+            query = "SELECT canonical, url, depth FROM frontier_urls WHERE crawl_key = ? AND state = ?"
+            params = [self.crawl_key, self.PENDING]
+            if shards is not None:
+                query += f" AND shard IN ({', '.join('?' * len(shards))})"
+                params.extend(shards)
+            rows = conn.execute(query + " ORDER BY priority, rowid LIMIT ?", (*params, limit)).fetchall()
+            conn.executemany("UPDATE frontier_urls SET state = ?, owner = ?, lease_expires = ? "
+                             "WHERE crawl_key = ? AND canonical = ?", 
+                             ((self.LEASED, owner, now + self.lease_seconds, self.crawl_key, canonical) 
+                              for canonical, _, _ in rows))
+            conn.execute("UPDATE frontier_crawls SET claimed = claimed + ? WHERE crawl_key = ?", 
+                         (len(rows), self.crawl_key))
+        return [(url, depth) for _, url, depth in rows]
+
+    def renew(self, owner):
+        with self.transaction() as conn:
+            return conn.execute("UPDATE frontier_urls SET lease_expires = ? WHERE crawl_key = ? AND state = ? "
+                                "AND owner = ?", (time.time() + self.lease_seconds, self.crawl_key, 
+                                                  self.LEASED, owner)).rowcount
+
+    def complete(self, owner, url, outlinks=(), depth=0, results=()):
+        rows = self.rows_for(outlinks, depth + 1)
+        canonical = self.canonicalize(url)
+        with self.transaction() as conn:
+            held = conn.execute("UPDATE frontier_urls SET state = ?, lease_expires = NULL "
+                                "WHERE crawl_key = ? AND canonical = ? AND state = ? AND owner = ?", 
+                                (self.DONE, self.crawl_key, canonical, self.LEASED, owner)).rowcount
+            if not held:
+                # The lease expired and its budget slot was given back, but the page was fetched anyway: 
+                # charge it again, and only take the row if nobody else has leased it since.
+                conn.execute("UPDATE frontier_crawls SET claimed = claimed + 1 WHERE crawl_key = ?", 
+                             (self.crawl_key,))
+                conn.execute("UPDATE frontier_urls SET state = ?, owner = ?, lease_expires = NULL "
+                             "WHERE crawl_key = ? AND canonical = ? AND state = ?", 
+                             (self.DONE, owner, self.crawl_key, canonical, self.PENDING))
+            conn.executemany("INSERT OR IGNORE INTO frontier_urls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR IGNORE INTO frontier_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", 
+                             ((self.crawl_key, r.source_url, r.matched_url, r.element, r.attribute, r.campaign, 
+                               r.keyword, r.content, r.location_type, r.timestamp) for r in results))
+
+    def release(self, owner, urls):
+        with self.transaction() as conn:
+            released = conn.executemany(
+                "UPDATE frontier_urls SET state = ?, owner = NULL, lease_expires = NULL "
+                "WHERE crawl_key = ? AND canonical = ? AND state = ? AND owner = ?", 
+                ((self.PENDING, self.crawl_key, self.canonicalize(url), self.LEASED, owner) for url in urls)).rowcount
+            conn.execute("UPDATE frontier_crawls SET claimed = claimed - ? WHERE crawl_key = ?", 
+                         (released, self.crawl_key))
+        return released
+
+    def status(self):
+        with self.lock:
+            crawl = self.conn.execute("SELECT max_pages, claimed, seeded FROM frontier_crawls WHERE crawl_key = ?", 
+                                      (self.crawl_key,)).fetchone()
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM frontier_urls WHERE crawl_key = ? "
+                                            "GROUP BY state", (self.crawl_key,)).fetchall())
+            results = self.conn.execute("SELECT COUNT(*) FROM frontier_results WHERE crawl_key = ?", 
+                                        (self.crawl_key,)).fetchone()[0]
+        max_pages, claimed, seeded = crawl or (self.max_pages, 0, 0)
+        return {
+            'max_pages': max_pages,
+            'claimed': claimed,
+            'seeded': bool(seeded),
+            'pending': counts.get(self.PENDING, 0),
+            'leased': counts.get(self.LEASED, 0),
+            'done': counts.get(self.DONE, 0),
+            'results': results
+        }
+
+    def finished(self):
+        status = self.status()
+        if not status['seeded']:
+            return False
+        if status['max_pages'] is not None and status['claimed'] >= status['max_pages'] and not status['leased']:
+            return True
+        return not status['pending'] and not status['leased']
+
+    def results(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT source_url, matched_url, element, attribute, campaign, keyword, content, location_type, "
+                "timestamp FROM frontier_results WHERE crawl_key = ? ORDER BY rowid", (self.crawl_key,)).fetchall()
+        return [MatchResult(*row) for row in rows]
+
+    def discard(self):
+        with self.transaction() as conn:
+            for table in ('frontier_crawls', 'frontier_urls', 'frontier_results'):
+                conn.execute(f"DELETE FROM {table} WHERE crawl_key = ?", (self.crawl_key,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class RobotsDisallowed(Exception):
+    pass
+
+class CrawlCancelled(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, capacity, min_rate=0.5, recovery=0.05):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate, capacity=None):
+        with self.lock:
+            self.rate = rate
+            self.max_rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+                self.tokens = min(self.tokens, capacity)
+
+    def throttle(self):
+        # Halve on each 429/503 and win back a small share of the ceiling per successful response.
+        with self.lock:
+            self.rate = min(self.max_rate, max(self.min_rate, self.rate / 2))
+
+    def recover(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, cancelled=None):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self.paused_until - now)
+        if wait > 0:
+            if cancelled is None:
+                time.sleep(wait)
+            elif cancelled.wait(wait):
+                raise CrawlCancelled("crawl cancelled")
+
+class HostScheduler:
+    RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, session, per_host_limit=10, requests_per_second=20.0, max_retries=3, 
+                 backoff_base=0.5, backoff_max=30.0, respect_robots=True, user_agent='Mozilla/5.0', 
+                 cancelled=None, metrics=None):
+        self.session = session
+        self.metrics = metrics
+        self.per_host_limit = per_host_limit
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.buckets = {}
+        self.robots = {}
+        self.robots_locks = defaultdict(threading.Lock)
+        self.retries = 0
+        self.cancelled = cancelled or threading.Event()
+
+    def host_state(self, host):
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+                self.buckets[host] = TokenBucket(self.requests_per_second, self.per_host_limit)
+            return self.slots[host], self.buckets[host]
+
+    def robots_for(self, url):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin in self.robots:
+            return self.robots[origin]
+        with self.robots_locks[origin]:
+            if origin in self.robots:
+                return self.robots[origin]
+            parser = urllib.robotparser.RobotFileParser(f"{origin}/robots.txt")
+            try:
+                response = self.session.get(f"{origin}/robots.txt", timeout=10, 
+                                            headers={'User-Agent': self.user_agent})
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except Exception:
+                parser.allow_all = True
+            delay = parser.crawl_delay(self.user_agent) if parser.mtime() else None
+            if delay:
+                _, bucket = self.host_state(parsed.netloc.lower())
+                bucket.set_rate(min(self.requests_per_second, 1.0 / float(delay)), capacity=1)
+            self.robots[origin] = parser
+            return parser
+
+    def allowed(self, url):
+        if not self.respect_robots:
+            return True
+        parser = self.robots_for(url)
+        if parser.allow_all:
+            return True
+        if parser.disallow_all:
+            return False
+        return parser.can_fetch(self.user_agent, url)
+
+    def retry_after(self, response):
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @contextmanager
+    def timed(self, stage):
+        if self.metrics is None or stage is None:
+            yield
+        else:
+            with self.metrics.time(stage):
+                yield
+
+    def sleep(self, seconds):
+        with self.timed('throttle_wait'):
+            if self.cancelled.wait(seconds):
+                raise CrawlCancelled("crawl cancelled")
+
+    @contextmanager
+    def slot(self, url):
+        slot, bucket = self.host_state(urlparse(url).netloc.lower())
+        # Waiting for a per-host slot or a token is throttling, not network time.
+        with self.timed('throttle_wait'):
+            slot.acquire()
+            try:
+                bucket.acquire(self.cancelled)
+            except BaseException:
+                slot.release()
+                raise
+        try:
+            if self.cancelled.is_set():
+                raise CrawlCancelled("crawl cancelled")
+            yield
+        finally:
+            slot.release()
+
+    def request(self, method, url, stage=None, **kwargs):
+        host = urlparse(url).netloc.lower()
+        for attempt in range(self.max_retries + 1):
+            if self.cancelled.is_set():
+                raise CrawlCancelled("crawl cancelled")
+            try:
+                with self.slot(url), self.timed(stage):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                self.sleep(self.backoff(attempt))
+                continue
+            if response.status_code not in self.RETRY_STATUSES:
+                self.host_state(host)[1].recover()
+                return response
+            if attempt >= self.max_retries:
+                return response
+            delay = self.retry_after(response)
+            if delay is None:
+                delay = self.backoff(attempt)
+            delay = min(delay, self.backoff_max)
+            if response.status_code in (429, 503):
+                bucket = self.host_state(host)[1]
+                bucket.pause(delay)
+                bucket.throttle()
+            response.close()
+            self.retries += 1
+            self.sleep(delay)
+        return response
+
+class SitemapDiscovery:
+    def __init__(self, crawler, max_sitemaps=50, max_depth=3):
+        self.crawler = crawler
+        self.max_sitemaps = max_sitemaps
+        self.max_depth = max_depth
+
+    def sitemap_sources(self):
+        start_url = self.crawler.start_url
+        sources = []
+        try:
+            sources.extend(self.crawler.scheduler.robots_for(start_url).site_maps() or [])
+        except Exception as e:
+            self.crawler.status_messages.append(f"Error reading robots.txt sitemaps: {str(e)}")
+        if not sources:
+            sources.append(urljoin(start_url, '/sitemap.xml'))
+        return sources
+
+    @staticmethod
+    def parse_lastmod(value):
+        if not value:
+            return 0.0
+        try:
+            parsed = datetime.datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return 0.0
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+
+    def iter_entries(self, sitemap_url):
+        response = self.crawler.scheduler.request('GET', sitemap_url, stream=True, timeout=30, 
+                                                  headers={'User-Agent': 'Mozilla/5.0'})
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            stream = response.raw
+            content_type = response.headers.get('Content-Type', '').lower()
+            if sitemap_url.lower().endswith('.gz') or 'gzip' in content_type:
+                stream = gzip.GzipFile(fileobj=stream)
+            for _, element in lxml.etree.iterparse(stream, events=('end',), tag=('{*}url', '{*}sitemap'), 
+                                                   recover=True, resolve_entities=False, no_network=True):
+                loc = element.findtext('{*}loc')
+                lastmod = element.findtext('{*}lastmod')
+                kind = lxml.etree.QName(element).localname
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+                if loc:
+                    yield kind, loc.strip(), self.parse_lastmod(lastmod)
+        finally:
+            response.close()
+
+    def discover(self, limit):
+        crawler = self.crawler
+        newest = []
+        counter = itertools.count()
+        pending = deque((url, 0) for url in self.sitemap_sources())
+        visited_sitemaps = set()
+        while pending and len(visited_sitemaps) < self.max_sitemaps:
+            sitemap_url, depth = pending.popleft()
+            if sitemap_url in visited_sitemaps:
+                continue
+            visited_sitemaps.add(sitemap_url)
+            try:
+                for kind, loc, lastmod in self.iter_entries(sitemap_url):
+                    if kind == 'sitemap':
+                        if depth < self.max_depth:
+                            pending.append((loc, depth + 1))
+                    elif crawler.is_subdomain_of(urlparse(loc).netloc):
+                        entry = (lastmod, -next(counter), loc)
+                        if len(newest) < limit:
+                            heapq.heappush(newest, entry)
+                        else:
+                            heapq.heappushpop(newest, entry)
+            except CrawlCancelled:
+                raise
+            except Exception as e:
+                crawler.status_messages.append(f"Error reading sitemap {sitemap_url}: {str(e)}")
+        return list(dict.fromkeys(loc for _, _, loc in sorted(newest, reverse=True)))
+
+METRICS_DIR = os.path.join(CACHE_DIR, 'metrics')
+
+class CrawlMetrics:
+    STAGES = ('throttle_wait', 'dns_connect', 'fetch', 'download', 'html_parse', 'element_scan', 'keyword_matching', 
+              'redirect_resolution')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = defaultdict(int)
+        self.timers = {stage: [0, 0.0, 0.0] for stage in self.STAGES}
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(stage, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+    def merge(self, timers):
+        with self.lock:
+            for stage, (count, total, peak) in timers.items():
+                timer = self.timers.setdefault(stage, [0, 0.0, 0.0])
+                timer[0] += count
+                timer[1] += total
+                timer[2] = max(timer[2], peak)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.time() - self.started
+            counters = dict(self.counters)
+            stages = {stage: {'count': count, 'total_seconds': round(total, 6), 
+                              'avg_seconds': round(total / count, 6) if count else 0.0, 
+                              'max_seconds': round(peak, 6)} 
+                      for stage, (count, total, peak) in self.timers.items()}
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'pages_per_second': round(counters.get('pages_fetched', 0) / elapsed, 3) if elapsed else 0.0,
+            'counters': counters,
+            'stages': stages
+        }
+
+    def to_prometheus(self, labels=None):
+        snapshot = self.snapshot()
+        label_text = ','.join(f'{k}="{v}"' for k, v in sorted((labels or {}).items()))
+
+        def series(name, value, extra=None):
+            parts = [label_text] if label_text else []
+            if extra:
+                parts.append(extra)
+            return f"{name}{{{','.join(parts)}}} {value}" if parts else f"{name} {value}"
+
+        lines = [
+            "# HELP stayalive_stage_seconds_total Time spent per crawl stage.",
+            "# TYPE stayalive_stage_seconds_total counter"
+        ]
+        for stage, timer in snapshot['stages'].items():
+            lines.append(series('stayalive_stage_seconds_total', timer['total_seconds'], f'stage="{stage}"'))
+        lines += [
+            "# HELP stayalive_stage_calls_total Calls per crawl stage.",
+            "# TYPE stayalive_stage_calls_total counter"
+        ]
+        for stage, timer in snapshot['stages'].items():
+            lines.append(series('stayalive_stage_calls_total', timer['count'], f'stage="{stage}"'))
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE stayalive_{name}_total counter")
+            lines.append(series(f'stayalive_{name}_total', value))
+        lines.append("# TYPE stayalive_pages_per_second gauge")
+        lines.append(series('stayalive_pages_per_second', snapshot['pages_per_second']))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=os.path.join(METRICS_DIR, 'stayalive.prom'), labels=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(labels))
+        os.replace(tmp_path, path)
+        return path
+
+    def write_json(self, path, extra=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        summary = dict(extra or {})
+        summary.update(self.snapshot())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return path
+
+class MetricsServer:
+    current = None
+
+    def __init__(self, port, host='127.0.0.1'):
+        import http.server
+
+        server_ref = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                metrics = server_ref.metrics
+                body = (metrics.to_prometheus(server_ref.labels) if metrics else '').encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.metrics = None
+        self.labels = None
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def publish(cls, metrics, labels=None, port=None):
+        port = port or int(os.environ.get('STAYALIVE_METRICS_PORT', '0') or 0)
+        if not port:
+            return None
+        if cls.current is None:
+            cls.current = cls(port)
+        cls.current.metrics = metrics
+        cls.current.labels = labels
+        return cls.current
+
+def instrumented_adapter(metrics, **kwargs):
+    class TimedHTTPConnection(urllib3.connection.HTTPConnection):
+        def connect(self):
+            with metrics.time('dns_connect'):
+                super().connect()
+
+    class TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+        def connect(self):
+            with metrics.time('dns_connect'):
+                super().connect()
+
+    class TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class InstrumentedAdapter(requests.adapters.HTTPAdapter):
+        def init_poolmanager(self, *args, **pool_kwargs):
+            super().init_poolmanager(*args, **pool_kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': TimedHTTPConnectionPool, 
+                'https': TimedHTTPSConnectionPool
+            }
+
+    return InstrumentedAdapter(**kwargs)
+
+SCRIPT_CONTENT_TYPES = ('javascript', 'ecmascript', 'application/json', 'text/plain')
+
+class ScriptAnalyzer:
+    # Bump when the analysis changes so results cached on disk by older versions are ignored.
+    VERSION = 1
+    URL_RE = re.compile(r'https?://[^\s\'"]+')
+    MIN_CACHED_LENGTH = 256
+
+    def __init__(self, crawler, disk_path=os.path.join(CACHE_DIR, 'scripts.sqlite'), max_entries=4096, 
+                 fetch_external=True):
+        self.crawler = crawler
+        self.fetch_external = fetch_external
+        self.by_hash = LRUCache(max_entries)
+        self.by_url = LRUCache(max_entries)
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.conn = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self.conn = sqlite3.connect(disk_path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            with self.conn:
+                self.conn.execute("""CREATE TABLE IF NOT EXISTS scripts (
+                    hash TEXT PRIMARY KEY, urls TEXT NOT NULL, analysed_at REAL NOT NULL)""")
+
+    def scan(self, code):
+        if len(code) < self.MIN_CACHED_LENGTH:
+            return tuple(dict.fromkeys(self.URL_RE.findall(code)))
+        key = hashlib.sha1(f"{self.VERSION}:{code}".encode('utf-8', 'surrogatepass')).hexdigest()
+        urls = self.by_hash.get(key)
+        if urls is None and self.conn is not None:
+            with self.lock:
+                row = self.conn.execute("SELECT urls FROM scripts WHERE hash = ?", (key,)).fetchone()
+            if row is not None:
+                urls = tuple(json.loads(row[0]))
+                self.by_hash[key] = urls
+        if urls is not None:
+            self.crawler.metrics.incr('script_cache_hits')
+            return urls
+        self.crawler.metrics.incr('script_cache_misses')
+        urls = tuple(dict.fromkeys(self.URL_RE.findall(code)))
+        self.by_hash[key] = urls
+        if self.conn is not None:
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO scripts VALUES (?, ?, ?)", 
+                                  (key, json.dumps(urls), time.time()))
+        return urls
+
+    def external(self, script_url):
+        urls = self.by_url.get(script_url)
+        if urls is not None:
+            return urls
+        with self.lock:
+            future = self.inflight.get(script_url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[script_url] = future
+        if not owner:
+            return future.result()
+        try:
+            urls = ()
+            try:
+                response = self.crawler.fetch(script_url, accepted_types=SCRIPT_CONTENT_TYPES)
+                if response.ok and response.content:
+                    self.crawler.metrics.incr('scripts_fetched')
+                    urls = self.scan(response.content.decode(response.encoding or 'utf-8', errors='replace'))
+            except (CrawlCancelled, ResponseRejected):
+                raise
+            except Exception as e:
+                self.crawler.status_messages.append(f"Error fetching script {script_url}: {str(e)}")
+            self.by_url[script_url] = urls
+            future.set_result(urls)
+            return urls
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(script_url, None)
+
+    def analyse(self, scripts, script_urls=()):
+        urls = []
+        for code in scripts:
+            urls.extend(self.scan(code))
+        if self.fetch_external:
+            for script_url in dict.fromkeys(script_urls):
+                if not script_url.startswith(('http://', 'https://')):
+                    continue
+                try:
+                    urls.extend(self.external(script_url))
+                except ResponseRejected:
+                    self.by_url[script_url] = ()
+        return urls
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+
+PARSE_WORKER = {}
+
+def init_parse_worker(backend, campaigns):
+    PARSE_WORKER['extractor'] = DomExtractor(backend)
+    PARSE_WORKER['matcher'] = KeywordMatcher([Campaign.from_dict(campaign) for campaign in campaigns])
+
+def parse_page(content, source_url, encoding):
+    metrics = CrawlMetrics()
+    extractor = PARSE_WORKER['extractor']
+    matcher = PARSE_WORKER['matcher']
+    extractor.metrics = metrics
+    extraction = extractor.extract(content, source_url, encoding)
+    matches = []
+    with metrics.time('keyword_matching'):
+        for matched_url, element, attribute, text, location_type in extraction.texts:
+            keywords = matcher.match(text)
+            if keywords:
+                matches.append((matched_url, element, attribute, text[:500], location_type, keywords))
+    script_candidates = []
+    for code in extraction.scripts:
+        script_candidates.extend(ScriptAnalyzer.URL_RE.findall(code))
+    return {
+        'matches': matches,
+        'links': extraction.links,
+        'script_candidates': list(dict.fromkeys(script_candidates)),
+        'script_urls': extraction.script_urls,
+        'timers': metrics.timers
+    }
+
+class ParsePool:
+    def __init__(self, processes, backend="bs4", campaigns=DEFAULT_CAMPAIGNS, max_pending=None):
+        import concurrent.futures
+        import importlib
+        import multiprocessing
+        # Under `streamlit run` this file executes as __main__, whose functions cannot be pickled by
+        # reference, so worker entry points come from the importable module instead.
+        module = importlib.import_module('stayalive') if __name__ == '__main__' else sys.modules[__name__]
+        self.processes = processes
+        self.slots = threading.BoundedSemaphore(max_pending or 2 * processes)
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context('spawn'), 
+            initializer=module.init_parse_worker, 
+            initargs=(backend, [campaign.to_dict() for campaign in campaigns]))
+        self.parse_page = module.parse_page
+
+    def parse(self, content, source_url, encoding):
+        with self.slots:
+            return self.executor.submit(self.parse_page, content, source_url, encoding).result()
+
+    def close(self):
+        # Waiting lets workers that are still starting finish their handshake; tearing the pool
+        # down under them raises FileNotFoundError from their semaphores.
+        self.executor.shutdown(wait=True, cancel_futures=True)
 
 class EnhancedWebCrawler:
-    def __init__(self, start_url, crawl_mode="Standard"):
+    def __init__(self, start_url, crawl_mode="Standard", max_workers=20, per_host_limit=10, 
+                 redirect_policy=None, redirect_cache_path=os.path.join(CACHE_DIR, 'redirects.sqlite'), 
+                 redirect_ttl=7 * 24 * 3600, canonicalizer=None, frontier_priority=None, 
+                 parser_backend="bs4", response_cache_size=256, 
+                 response_cache_path=os.path.join(CACHE_DIR, 'responses.sqlite'), 
+                 response_cache_max_bytes=256 * 1024 * 1024, 
+                 checkpoint=None, checkpoint_interval=25, incremental=False, 
+                 page_state_path=os.path.join(CACHE_DIR, 'pages.sqlite'), requests_per_second=20.0, 
+                 max_retries=3, respect_robots=True, use_sitemaps=True, memory_budget=None, 
+                 max_body_bytes=5 * 1024 * 1024, accepted_types=HTML_CONTENT_TYPES, 
+                 script_cache_path=os.path.join(CACHE_DIR, 'scripts.sqlite'), scan_external_scripts=True, 
+                 parse_processes=0, campaigns=None, shared_frontier=None, 
+                 match_index_path=os.path.join(CACHE_DIR, 'matches.sqlite')):
+        self.metrics = CrawlMetrics()
+        self.cancelled = threading.Event()
+        self.interrupted = []
+        self.max_body_bytes = max_body_bytes
+        self.accepted_types = tuple(accepted_types or ())
         self.session = requests.Session()
+        adapter = instrumented_adapter(self.metrics, pool_connections=max(10, max_workers), 
+                                       pool_maxsize=2 * max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.scheduler = HostScheduler(self.session, per_host_limit=per_host_limit, 
+                                       requests_per_second=requests_per_second, 
+                                       max_retries=max_retries, respect_robots=respect_robots, 
+                                       cancelled=self.cancelled, metrics=self.metrics)
         self.start_url = start_url
-        self.keywords = ["gowithguide", "go with guide", "go-with-guide", "87121"]
+        self.campaigns = list(campaigns) if campaigns is not None else load_campaigns()
+        self.campaigns_signature = campaigns_signature(self.campaigns)
+        self.keywords = list(dict.fromkeys(kw for campaign in self.campaigns for kw in campaign.keywords))
+        self.matcher = KeywordMatcher(self.campaigns)
         self.main_domain = urlparse(start_url).netloc
         self.crawl_mode = crawl_mode
         self.max_pages = {"Quick": 1, "Standard": 100, "Complete": 1000}[crawl_mode]
-        self.visited = set()
-        self.results = []
-        self.queue = deque([start_url])
+        self.memory_budget = memory_budget
+        self.results = memory_budget.result_store() if memory_budget else ResultStore()
+        self.frontier = URLFrontier(canonicalizer, frontier_priority, memory_budget)
+        if checkpoint is None:
+            self.frontier.visited_log = None
+        self.frontier.push(start_url)
         self.categories = []
         self.current_category = None
-        self.status_messages = []
+        self.status_messages = memory_budget.status_log() if memory_budget else StatusLog()
         self.user_stopped = False
         self.pages_crawled = 0
-        self.redirect_cache = {}
+        self.in_flight = {}
+        self.redirect_cache = LRUCache(memory_budget.redirect_cache_size if memory_budget else None)
         self.internal_links = set()
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.lock = threading.Lock()
+        self.redirect_policy = redirect_policy or RedirectPolicy()
+        self.redirect_store = None
+        if redirect_cache_path:
+            try:
+                self.redirect_store = RedirectCache(redirect_cache_path, ttl=redirect_ttl)
+            except Exception as e:
+                self.status_messages.append(f"Redirect cache disabled: {str(e)}")
+        self.redirect_pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.redirect_inflight = {}
+        self.extractor = DomExtractor(parser_backend, metrics=self.metrics)
+        self.parse_pool = None
+        if parse_processes:
+            # Fetch threads need a core of their own, and pickling every page costs more than it
+            # saves without spare cores to parse on.
+            spare = min(parse_processes, (os.cpu_count() or 1) - 1)
+            if spare > 0:
+                self.parse_pool = ParsePool(spare, parser_backend, self.campaigns)
+            else:
+                self.status_messages.append("Parse processes need a spare CPU core; parsing in the crawler threads")
+        try:
+            self.script_analyzer = ScriptAnalyzer(self, script_cache_path, fetch_external=scan_external_scripts)
+        except Exception as e:
+            self.status_messages.append(f"Script disk cache disabled: {str(e)}")
+            self.script_analyzer = ScriptAnalyzer(self, None, fetch_external=scan_external_scripts)
+        self.crawl_started = time.time()
+        # A bounded crawl caps the in-memory response tier by bytes; bodies can be megabytes each.
+        response_memory_bytes = memory_budget.response_cache_bytes if memory_budget else None
+        try:
+            self.response_cache = ResponseCache(response_cache_size, response_cache_path, response_cache_max_bytes, 
+                                                response_memory_bytes)
+        except Exception as e:
+            self.status_messages.append(f"Response disk cache disabled: {str(e)}")
+            self.response_cache = ResponseCache(response_cache_size, max_memory_bytes=response_memory_bytes)
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_saved = {'results': 0, 'redirects': 0}
+        self.checkpoint_pages = 0
+        self.page_states = PageStateStore(page_state_path) if incremental else None
+        self.page_capture = threading.local()
+        self.match_changes = memory_budget.match_changes() if memory_budget else MatchChanges()
+        self.pages_reused = 0
+        self.use_sitemaps = use_sitemaps
+        self.sitemaps_seeded = False
+        self.shared_frontier = shared_frontier
+        self.match_index = None
+        self.index_crawl_id = None
+        self.index_buffer = []
+        self.index_lock = threading.Lock()
+        self.restoring = False
+        if match_index_path:
+            try:
+                self.match_index = MatchIndex(match_index_path)
+                self.results.add_listener(self.index_result)
+            except Exception as e:
+                self.status_messages.append(f"Match index disabled: {str(e)}")
+
+    def resume(self):
+        if self.checkpoint is None:
+            return False
+        try:
+            state = self.checkpoint.find(self.start_url, self.crawl_mode)
+            if state is None or state['complete']:
+                return False
+            # Restored matches were indexed by the run that found them.
+            self.restoring = True
+            return self.checkpoint.restore(self)
+        except Exception as e:
+            self.status_messages.append(f"Error restoring checkpoint: {str(e)}")
+            return False
+        finally:
+            self.restoring = False
+
+    def save_checkpoint(self, complete=False):
+        if self.checkpoint is None:
+            return
+        try:
+            self.checkpoint.save(self, complete=complete)
+            self.checkpoint_pages = self.pages_crawled
+        except Exception as e:
+            self.status_messages.append(f"Error saving checkpoint: {str(e)}")
+
+    def maybe_checkpoint(self):
+        if self.checkpoint is not None and self.pages_crawled - self.checkpoint_pages >= self.checkpoint_interval:
+            self.save_checkpoint()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def release_url(self, url):
+        with self.lock:
+            self.in_flight.pop(url, None)
+            self.pages_crawled -= 1
+            self.interrupted.append(url)
+
+    def finish_url(self, url):
+        with self.lock:
+            self.in_flight.pop(url, None)
+
+    def index_result(self, record):
+        if self.restoring:
+            return
+        with self.index_lock:
+            self.index_buffer.append(record)
+            if len(self.index_buffer) < 200:
+                return
+        self.flush_index()
+
+    def flush_index(self, final=False):
+        if self.match_index is None:
+            return
+        with self.index_lock:
+            records, self.index_buffer = self.index_buffer, []
+            try:
+                if self.index_crawl_id is None:
+                    self.index_crawl_id = self.match_index.start_crawl(self.start_url, self.crawl_mode, 
+                                                                       self.crawl_started)
+                self.match_index.add(self.index_crawl_id, records)
+                if final:
+                    self.match_index.finish_crawl(self.index_crawl_id, self.pages_crawled, len(self.results))
+            except Exception as e:
+                self.status_messages.append(f"Error writing match index: {str(e)}")
+
+    def close(self):
+        self.redirect_pool.shutdown(wait=False, cancel_futures=True)
+        if self.redirect_store:
+            self.redirect_store.close()
+        self.response_cache.close()
+        if self.page_states:
+            self.page_states.close()
+        self.script_analyzer.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.match_index is not None:
+            if self.index_buffer:
+                self.flush_index()
+            self.match_index.close()
+        self.match_changes.close()
+        self.results.close()
+
+    def metrics_labels(self):
+        return {'site': self.main_domain, 'mode': self.crawl_mode}
+
+    def export_metrics(self, directory=METRICS_DIR, final=False):
+        self.metrics.counters['http_retries'] = self.scheduler.retries
+        self.metrics.write_prometheus(os.path.join(directory, 'stayalive.prom'), self.metrics_labels())
+        if not final:
+            return None
+        stamp = datetime.datetime.fromtimestamp(self.metrics.started).strftime('%Y%m%d_%H%M%S')
+        slug = re.sub(r'[^A-Za-z0-9._-]+', '_', self.main_domain) or 'site'
+        return self.metrics.write_json(os.path.join(directory, f"{slug}_{stamp}.json"), {
+            'start_url': self.start_url, 
+            'crawl_mode': self.crawl_mode, 
+            'pages_crawled': self.pages_crawled, 
+            'matches': len(self.results)
+        })
+
+    def fetch(self, url, timeout=15, previous=None, accepted_types=None):
+        cache = self.response_cache
+        entry = cache.get(url)
+        if entry is not None and (entry.fetched_at >= self.crawl_started or entry.is_fresh()):
+            self.metrics.incr('response_cache_hits')
+            entry.from_cache = True
+            return entry
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        if entry is not None:
+            headers.update(entry.validators())
+        elif previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        if not self.scheduler.allowed(url):
+            raise RobotsDisallowed(f"blocked by robots.txt: {url}")
+        response = self.scheduler.request('GET', url, stage='fetch', headers=headers, timeout=timeout, 
+                                          allow_redirects=True, stream=True)
+        with self.metrics.time('download'):
+            content = self.read_body(response, accepted_types)
+        self.metrics.incr('bytes_downloaded', len(content))
+        if entry is None and response.status_code == 304:
+            self.metrics.incr('response_cache_revalidations')
+            return CachedResponse.from_response(response, content)
+        if entry is not None and response.status_code == 304:
+            self.metrics.incr('response_cache_revalidations')
+            entry = entry.revalidated(response)
+            entry.from_cache = True
+            cache.put(url, entry)
+            return entry
+        self.metrics.incr('response_cache_misses')
+        fetched = CachedResponse.from_response(response, content)
+        cache.put(url, fetched)
+        if fetched.url != url:
+            cache.put(fetched.url, fetched)
+        return fetched
+
+    def accepts(self, headers, accepted_types=None):
+        accepted_types = self.accepted_types if accepted_types is None else accepted_types
+        content_type = headers.get('Content-Type', '').lower()
+        return not accepted_types or any(accepted in content_type for accepted in accepted_types)
+
+    def read_body(self, response, accepted_types=None):
+        try:
+            if not 200 <= response.status_code < 300:
+                return b''
+            if not self.accepts(response.headers, accepted_types):
+                self.metrics.incr('responses_rejected')
+                raise ResponseRejected(f"unsupported Content-Type {response.headers.get('Content-Type')!r}: "
+                                       f"{response.url}")
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                body += chunk
+                if self.max_body_bytes and len(body) > self.max_body_bytes:
+                    self.metrics.incr('responses_truncated')
+                    del body[self.max_body_bytes:]
+                    break
+            return bytes(body)
+        finally:
+            response.close()
 
     def is_subdomain_of(self, url_netloc):
         main_domain = self.main_domain.replace("www.", "").lower()
@@ -34,60 +2564,85 @@ class EnhancedWebCrawler:
         return url_netloc.endswith("." + main_domain) or url_netloc == main_domain
 
     def resolve_redirects(self, url):
-        if url in self.redirect_cache:
-            return self.redirect_cache[url]
+        cached = self.redirect_cache.get(url)
+        if cached is not None:
+            return cached
         try:
-            response = self.session.head(url, allow_redirects=True, timeout=10, 
-                                        headers={'User-Agent': 'Mozilla/5.0'})
+            response = self.scheduler.request('HEAD', url, allow_redirects=True, timeout=10, 
+                                              headers={'User-Agent': 'Mozilla/5.0'})
             final_url = response.url
             history = [r.url for r in response.history]
             if not history and url != final_url:
-                response_get = self.session.get(url, allow_redirects=False, timeout=10)
+                response_get = self.scheduler.request('GET', url, allow_redirects=False, timeout=10)
                 if 300 <= response_get.status_code < 400:
                     location = response_get.headers.get('Location', '')
                     if location:
                         history = [url]
                         final_url = urljoin(url, location)
             self.redirect_cache[url] = (final_url, history)
+            if self.redirect_store:
+                self.redirect_store.put(url, final_url, history)
             return final_url, history
+        except CrawlCancelled:
+            raise
         except Exception as e:
             self.status_messages.append(f"Error resolving redirects for {url}: {str(e)}")
+            self.redirect_cache[url] = (url, [])
             return url, []
 
+    def resolve_many(self, urls):
+        with self.metrics.time('redirect_resolution'):
+            return self._resolve_many(urls)
+
+    def _resolve_many(self, urls):
+        resolved = {}
+        futures = {}
+        for url in dict.fromkeys(urls):
+            if not self.redirect_policy.should_resolve(url, self.is_subdomain_of):
+                continue
+            cached = self.redirect_cache.get(url)
+            if cached is None and self.redirect_store:
+                cached = self.redirect_store.get(url)
+                if cached is not None:
+                    self.redirect_cache[url] = cached
+            if cached is not None:
+                self.metrics.incr('redirect_cache_hits')
+                resolved[url] = cached
+                continue
+            self.metrics.incr('redirect_cache_misses')
+            with self.lock:
+                future = self.redirect_inflight.get(url)
+                if future is None:
+                    future = self.redirect_pool.submit(self.resolve_redirects, url)
+                    self.redirect_inflight[url] = future
+                    future.add_done_callback(lambda f, u=url: self.redirect_inflight.pop(u, None))
+            futures[url] = future
+        for url, future in futures.items():
+            try:
+                resolved[url] = future.result()
+            except CrawlCancelled:
+                raise
+            except Exception as e:
+                self.status_messages.append(f"Error resolving redirects for {url}: {str(e)}")
+        return resolved
+
     def get_matched_keywords(self, text):
-        if not isinstance(text, str) or not text.strip():
-            return []
-        text_lower = text.lower().strip()
-        exact_matches = []
-        for kw in self.keywords:
-            kw_lower = kw.lower()
-            pattern = rf'(?:^|\s|[-_/=]){re.escape(kw_lower)}(?:$|\s|[-_/=])'
-            if re.search(pattern, text_lower):
-                exact_matches.append(kw)
-            kw_encoded = kw.replace(' ', '%20')
-            pattern_encoded = rf'(?:^|\s|[-_/=]){re.escape(kw_encoded)}(?:$|\s|[-_/=])'
-            if re.search(pattern_encoded, text_lower):
-                exact_matches.append(kw)
-        url_patterns = [
-            r'(?:https?://)?(?:www\.)?gowithguide\.com',
-            r'utm_source=([^&]*)',
-            r'utm_campaign=([^&]*)',
-            r'sv1=([^&]*)',
-            r'awc=([^&]*)',
-            r'87121(?:_\d+|%5F\d+)?'
-        ]
-        for pattern in url_patterns:
-            matches = re.findall(pattern, text_lower)
-            for match in matches:
-                if isinstance(match, str):
-                    for kw in self.keywords:
-                        if kw.lower() in match.lower():
-                            exact_matches.append(kw)
-        return list(set(exact_matches))
+        started = time.perf_counter()
+        matched = self.matcher.match(text)
+        self.metrics.observe('keyword_matching', time.perf_counter() - started)
+        return matched
 
     def check_url_for_keywords(self, url, source_url):
-        if not url or not isinstance(url, str):
-            return
+        self.check_urls_for_keywords([url], source_url)
+
+    def check_urls_for_keywords(self, urls, source_url):
+        urls = list(dict.fromkeys(url for url in urls if url and isinstance(url, str)))
+        resolved = self.resolve_many(urls)
+        for url in urls:
+            final_url, history = resolved.get(url, (url, []))
+            self.check_resolved_url(url, final_url, history, source_url)
+
+    def check_resolved_url(self, url, final_url, history, source_url):
         matched_kws = self.get_matched_keywords(url)
         if matched_kws:
             self.add_result(
@@ -99,7 +2654,6 @@ class EnhancedWebCrawler:
                 keywords=matched_kws,
                 location_type='direct_url'
             )
-        final_url, history = self.resolve_redirects(url)
         if final_url != url:
             matched_kws_final = self.get_matched_keywords(final_url)
             if matched_kws_final:
@@ -125,157 +2679,179 @@ class EnhancedWebCrawler:
                     location_type='redirect_chain_url'
                 )
 
+    def claim_url(self, url, depth=0):
+        with self.lock:
+            if not url or self.pages_crawled >= self.max_pages or not self.frontier.mark_visited(url):
+                return False
+            self.pages_crawled += 1
+            self.in_flight[url] = depth
+            return True
+
     def process_url(self, url):
-        if url in self.visited or self.pages_crawled >= self.max_pages or not url:
+        if not self.claim_url(url):
             return []
-        self.visited.add(url)
-        self.pages_crawled += 1
+        new_urls = self.crawl_claimed_url(url)
+        self.finish_url(url)
+        return new_urls or []
+
+    def crawl_claimed_url(self, url, stop=None):
         try:
-            response = self.session.get(url, headers={'User-Agent': 'Mozilla/5.0'}, 
-                                     timeout=15, allow_redirects=True)
+            return self.crawl_page(url, stop)
+        except CrawlCancelled:
+            self.release_url(url)
+            return None
+
+    @staticmethod
+    def check_stop(stop):
+        if stop is not None and stop.is_set():
+            raise CrawlCancelled("crawl stopped")
+
+    def crawl_page(self, url, stop=None):
+        previous = self.page_states.get(url) if self.page_states else None
+        if previous and previous['campaigns'] != self.campaigns_signature:
+            previous = None
+        try:
+            response = self.fetch(url, previous=previous)
             response.raise_for_status()
+        except CrawlCancelled:
+            raise
+        except ResponseRejected:
+            return []
         except Exception as e:
             self.status_messages.append(f"Error fetching {url}: {str(e)}")
             return []
-        if 'text/html' not in response.headers.get('Content-Type', ''):
+        self.metrics.incr('pages_fetched')
+        self.check_stop(stop)
+        if response.status_code == 304 and previous:
+            return self.reuse_page(previous)
+        if not self.accepts(response.headers):
             return []
         final_url = response.url
-        soup = BeautifulSoup(response.text, 'lxml')
-        elements = soup.find_all(['a', 'div', 'section', 'title', 'main', 
-                                'article', 'span', 'p', 'img', 'meta', 'iframe', 'script'])
-        internal_urls = []
-        for element in elements:
-            urls = self.check_element(element, final_url)
-            internal_urls.extend(urls)
-        script_tags = soup.find_all('script')
-        for script in script_tags:
-            if script.string:
-                urls_in_js = re.findall(r'(https?://[^\s\'"]+)', script.string)
-                for js_url in urls_in_js:
-                    self.check_url_for_keywords(js_url, final_url)
-                    parsed_js_url = urlparse(js_url)
-                    if self.is_subdomain_of(parsed_js_url.netloc):
-                        internal_urls.append(js_url)
-                json_patterns = [
-                    r'["\']?(?:url|href)["\']?\s*:\s*["\']?(https?://[^\s\'"]+)["\']?',
-                    r'window\.location\s*=\s*["\']?(https?://[^\s\'"]+)["\']?'
-                ]
-                for pattern in json_patterns:
-                    matches = re.findall(pattern, script.string)
-                    for match in matches:
-                        self.check_url_for_keywords(match, final_url)
-                        if self.is_subdomain_of(urlparse(match).netloc):
-                            internal_urls.append(match)
+        content_hash = None
+        if self.page_states:
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            if previous and previous['content_hash'] == content_hash:
+                return self.reuse_page(previous)
+        parsed = None
+        if self.parse_pool is not None:
+            try:
+                parsed = self.parse_pool.parse(response.content, final_url, response.encoding)
+            except Exception as e:
+                self.status_messages.append(f"Error in parse pool, parsing in-thread: {str(e)}")
+        if parsed is None:
+            extraction = self.extractor.extract(response.content, final_url, response.encoding)
+        self.page_capture.matches = []
+        try:
+            if parsed is not None:
+                internal_urls = self.analyse_parsed(parsed, final_url, stop)
+            else:
+                internal_urls = self.analyse_page(extraction, final_url, stop)
+        finally:
+            matches = self.page_capture.matches
+            self.page_capture.matches = None
+        if self.page_states:
+            self.page_states.put(url, final_url, content_hash, response.headers.get('ETag'), 
+                                 response.headers.get('Last-Modified'), matches, internal_urls, 
+                                 self.campaigns_signature)
+            self.record_changes(previous, matches)
         return internal_urls
 
-    def check_element(self, element, source_url):
-        internal_urls = []
-        element_type = element.name if element.name else 'unknown'
-        if element.has_attr('href'):
-            href = element['href'].strip()
-            if href:
-                resolved_url = urljoin(source_url, href)
-                self.check_url_for_keywords(resolved_url, source_url)
-                text = element.get_text(separator=' ', strip=True)
-                matched_kws = self.get_matched_keywords(text)
-                if matched_kws:
-                    self.add_result(
-                        source_url=source_url,
-                        matched_url=resolved_url,
-                        element=element_type,
-                        attribute='text',
-                        content=text,
-                        keywords=matched_kws,
-                        location_type='anchor_text'
-                    )
-                parsed_url = urlparse(resolved_url)
-                if self.is_subdomain_of(parsed_url.netloc):
-                    internal_urls.append(resolved_url)
-        if element.name == 'a':
-            img = element.find('img')
-            if img and img.get('alt'):
-                alt_text = img['alt'].strip()
-                matched_kws = self.get_matched_keywords(alt_text)
-                if matched_kws and element.has_attr('href'):
-                    resolved_url = urljoin(source_url, element['href'].strip())
-                    self.add_result(
-                        source_url=source_url,
-                        matched_url=resolved_url,
-                        element='a',
-                        attribute='img_alt',
-                        content=alt_text,
-                        keywords=matched_kws,
-                        location_type='image_banner'
-                    )
-        if element.name in ['p', 'div', 'span', 'title', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            text = element.get_text(separator=' ', strip=True)
-            matched_kws = self.get_matched_keywords(text)
-            if matched_kws:
-                self.add_result(
-                    source_url=source_url,
-                    matched_url=source_url,
-                    element=element_type,
-                    attribute='text',
-                    content=text,
-                    keywords=matched_kws,
-                    location_type='content'
-                )
-        if element.name == 'meta' and element.get('content'):
-            content = element['content'].strip()
+    def reuse_page(self, previous):
+        self.pages_reused += 1
+        self.metrics.incr('pages_reused')
+        for match in previous['matches']:
+            self.results.add(*match)
+        self.record_changes(previous, previous['matches'])
+        return list(previous['outlinks'])
+
+    def record_changes(self, previous, matches):
+        def match_key(match):
+            source_url, matched_url, element, attribute, campaign, keyword, _, location_type = match
+            return (source_url, matched_url, campaign, keyword, location_type, element, attribute)
+
+        current = {match_key(match): match for match in matches}
+        before = {match_key(match): match for match in previous['matches']} if previous else {}
+        for key, match in current.items():
+            self.match_changes.add('unchanged' if key in before else 'new', match)
+        for key, match in before.items():
+            if key not in current:
+                self.match_changes.add('gone', match)
+
+    def change_report(self, limit=None):
+        rows = []
+        for change in MatchChanges.KINDS:
+            for (source_url, matched_url, element, attribute, campaign, keyword, content, 
+                 location_type) in self.match_changes.rows(change, limit):
+                rows.append({
+                    'change': change,
+                    'source_url': source_url,
+                    'matched_url': matched_url,
+                    'campaign': campaign,
+                    'keyword': keyword,
+                    'location_type': location_type,
+                    'element': element,
+                    'attribute': attribute,
+                    'content_sample': content[:300]
+                })
+        return rows
+
+    def analyse_page(self, extraction, source_url, stop=None):
+        for matched_url, element, attribute, content, location_type in extraction.texts:
             matched_kws = self.get_matched_keywords(content)
             if matched_kws:
-                attr_name = element.get('name') or element.get('property') or 'meta'
                 self.add_result(
                     source_url=source_url,
-                    matched_url=source_url,
-                    element=element_type,
-                    attribute=attr_name,
+                    matched_url=matched_url,
+                    element=element,
+                    attribute=attribute,
                     content=content,
                     keywords=matched_kws,
-                    location_type='meta'
+                    location_type=location_type
                 )
-        if element.name == 'img' and element.get('alt'):
-            alt_text = element['alt'].strip()
-            matched_kws = self.get_matched_keywords(alt_text)
-            if matched_kws:
-                self.add_result(
-                    source_url=source_url,
-                    matched_url=source_url,
-                    element=element_type,
-                    attribute='alt',
-                    content=alt_text,
-                    keywords=matched_kws,
-                    location_type='alt_text'
-                )
-        for attr in element.attrs:
-            if attr.startswith('data-') and isinstance(element[attr], str):
-                if 'url' in attr.lower() or 'href' in attr.lower():
-                    data_url = element[attr].strip()
-                    if data_url:
-                        self.check_url_for_keywords(data_url, source_url)
-                        if self.is_subdomain_of(urlparse(data_url).netloc):
-                            internal_urls.append(data_url)
+        self.check_stop(stop)
+        candidate_urls = list(extraction.links)
+        with self.metrics.time('script_analysis'):
+            candidate_urls.extend(self.script_analyzer.analyse(extraction.scripts, extraction.script_urls))
+        return self.analyse_candidates(candidate_urls, source_url, stop)
+
+    def analyse_parsed(self, parsed, source_url, stop=None):
+        self.metrics.merge(parsed['timers'])
+        for matched_url, element, attribute, content, location_type, keywords in parsed['matches']:
+            self.add_result(
+                source_url=source_url,
+                matched_url=matched_url,
+                element=element,
+                attribute=attribute,
+                content=content,
+                keywords=keywords,
+                location_type=location_type
+            )
+        self.check_stop(stop)
+        candidate_urls = list(parsed['links']) + parsed['script_candidates']
+        with self.metrics.time('script_analysis'):
+            candidate_urls.extend(self.script_analyzer.analyse((), parsed['script_urls']))
+        return self.analyse_candidates(candidate_urls, source_url, stop)
+
+    def analyse_candidates(self, candidate_urls, source_url, stop=None):
+        internal_urls = [candidate for candidate in candidate_urls 
+                         if self.is_subdomain_of(urlparse(candidate).netloc)]
+        self.check_stop(stop)
+        self.check_urls_for_keywords(candidate_urls, source_url)
         return internal_urls
 
     def add_result(self, source_url, matched_url, element, attribute, content, keywords, location_type):
-        for keyword in keywords:
-            result = {
-                'source_url': source_url,
-                'matched_url': matched_url,
-                'element': element,
-                'attribute': attribute,
-                'keyword': keyword,
-                'content': content[:500],
-                'location_type': location_type,
-                'timestamp': datetime.datetime.now().isoformat()
-            }
-            if result not in self.results:
-                self.results.append(result)
+        captured = getattr(self.page_capture, 'matches', None)
+        for campaign, keyword in keywords:
+            self.results.add(source_url, matched_url, element, attribute, campaign, keyword, 
+                             content[:500], location_type)
+            if captured is not None:
+                captured.append((source_url, matched_url, element, attribute, campaign, keyword, 
+                                 content[:500], location_type))
 
     def extract_categories(self):
         try:
-            response = self.session.get(self.start_url)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response = self.fetch(self.start_url)
+            soup = BeautifulSoup(response.content, 'lxml', from_encoding=response.encoding)
             categories = []
             category_priority = ['travel', 'blog', 'resources']
             for link in soup.find_all('a', href=True):
@@ -308,8 +2884,8 @@ class EnhancedWebCrawler:
 
     def get_main_pages(self):
         try:
-            response = self.session.get(self.start_url)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response = self.fetch(self.start_url)
+            soup = BeautifulSoup(response.content, 'lxml', from_encoding=response.encoding)
             main_links = []
             for link in soup.find_all('a', href=True):
                 url = urljoin(self.start_url, link['href'])
@@ -322,10 +2898,59 @@ class EnhancedWebCrawler:
             self.status_messages.append(f"Error getting main pages: {str(e)}")
             return []
 
+    def discover_sitemap_urls(self):
+        if not self.use_sitemaps:
+            return []
+        urls = SitemapDiscovery(self).discover(self.max_pages)
+        if urls:
+            self.status_messages.append(f"Found {len(urls)} pages in sitemaps")
+        return urls
+
+    def seed_from_sitemaps(self):
+        if self.sitemaps_seeded:
+            return 0
+        self.sitemaps_seeded = True
+        seeded = 0
+        for url in self.discover_sitemap_urls():
+            if self.frontier.push(url, 1):
+                seeded += 1
+        return seeded
+
+    def get_seed_urls(self):
+        seeds = self.discover_sitemap_urls()
+        seeds.extend(self.get_main_pages())
+        return [url for url in dict.fromkeys(seeds) if url != self.start_url][:self.max_pages]
+
+    def crawl(self, should_continue=lambda: True, on_page=None):
+        try:
+            return self.run_crawl(should_continue, on_page)
+        except CrawlCancelled:
+            return self.results
+        finally:
+            self.flush_index(final=True)
+
+    def run_crawl(self, should_continue, on_page):
+        if self.crawl_mode == "Complete" and self.shared_frontier is not None:
+            SharedFrontierEngine(self, self.shared_frontier).run(should_continue=should_continue, on_page=on_page)
+            return self.results
+        if self.crawl_mode == "Complete":
+            self.seed_from_sitemaps()
+            ConcurrentFetchEngine(self).run(should_continue=should_continue, on_page=on_page)
+            return self.results
+        if should_continue():
+            new_urls = self.process_url(self.start_url)
+            if on_page:
+                on_page(self.start_url, new_urls)
+            self.maybe_checkpoint()
+        if self.crawl_mode == "Quick" or self.results or not should_continue():
+            return self.results
+        StandardExplorer(self).run(should_continue=should_continue, on_page=on_page)
+        return self.results
+
     def get_category_pages(self, category_url):
         try:
-            response = self.session.get(category_url)
-            soup = BeautifulSoup(response.text, 'lxml')
+            response = self.fetch(category_url)
+            soup = BeautifulSoup(response.content, 'lxml', from_encoding=response.encoding)
             article_links = []
             for link in soup.find_all('a', href=True):
                 url = urljoin(category_url, link['href'])
@@ -347,26 +2972,464 @@ class EnhancedWebCrawler:
             self.status_messages.append(f"Error getting category pages: {str(e)}")
             return []
 
-def generate_csv(results):
-    csv_file = StringIO()
-    writer = csv.DictWriter(csv_file, fieldnames=[
-        'source_url', 'matched_url', 'keyword', 
-        'location_type', 'element', 'attribute',
-        'content_sample', 'timestamp'
-    ])
-    writer.writeheader()
-    for result in results:
-        writer.writerow({
-            'source_url': result['source_url'],
-            'matched_url': result['matched_url'],
-            'keyword': result['keyword'],
-            'location_type': result['location_type'],
-            'element': result['element'],
-            'attribute': result['attribute'],
-            'content_sample': result['content'][:300],
-            'timestamp': result['timestamp']
-        })
-    return csv_file.getvalue()
+class ConcurrentFetchEngine:
+    def __init__(self, crawler, max_workers=None):
+        self.crawler = crawler
+        self.max_workers = max_workers or crawler.max_workers
+
+    def enqueue(self, new_urls, depth):
+        crawler = self.crawler
+        for new_url in new_urls:
+            if crawler.pages_crawled >= crawler.max_pages:
+                break
+            crawler.frontier.push(new_url, depth)
+
+    def run(self, should_continue=lambda: True, on_page=None):
+        crawler = self.crawler
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                while (len(pending) < self.max_workers and crawler.frontier and 
+                       crawler.pages_crawled < crawler.max_pages and should_continue()):
+                    entry = crawler.frontier.pop()
+                    if entry is None:
+                        break
+                    url, depth = entry
+                    if crawler.claim_url(url, depth):
+                        pending[pool.submit(crawler.crawl_claimed_url, url)] = (url, depth)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = pending.pop(future)
+                    try:
+                        new_urls = future.result()
+                    except Exception as e:
+                        crawler.status_messages.append(f"Error processing {url}: {str(e)}")
+                        new_urls = []
+                    if new_urls is None:
+                        continue
+                    self.enqueue(new_urls, depth + 1)
+                    crawler.finish_url(url)
+                    crawler.maybe_checkpoint()
+                    if on_page:
+                        on_page(url, new_urls)
+        return crawler.pages_crawled
+
+class SharedFrontierEngine:
+    def __init__(self, crawler, frontier, owner=None, shards=None, max_workers=None, poll_interval=1.0):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.shards = shards
+        self.max_workers = max_workers or crawler.max_workers
+        self.poll_interval = poll_interval
+        self.local = threading.local()
+        crawler.results.add_listener(self.capture)
+
+    def capture(self, record):
+        captured = getattr(self.local, 'results', None)
+        if captured is not None:
+            captured.append(record)
+
+    def crawl(self, url):
+        self.local.results = []
+        try:
+            return self.crawler.crawl_page(url), self.local.results
+        except CrawlCancelled:
+            return None, []
+        finally:
+            self.local.results = None
+
+    def seed(self):
+        crawler = self.crawler
+        if self.frontier.open(crawler.max_pages):
+            seeds = [crawler.start_url]
+            if crawler.crawl_mode == "Complete":
+                seeds.extend(crawler.discover_sitemap_urls())
+            self.frontier.seed(seeds)
+
+    def run(self, should_continue=lambda: True, on_page=None):
+        crawler = self.crawler
+        frontier = self.frontier
+        self.seed()
+        pending = {}
+        renewed = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while True:
+                    free = self.max_workers - len(pending)
+                    # Lease in batches to keep write transactions on the shared database few.
+                    if should_continue() and (not pending or free >= max(1, self.max_workers // 4)):
+                        for url, depth in frontier.lease(self.owner, free, self.shards):
+                            crawler.frontier.mark_visited(url)
+                            with crawler.lock:
+                                crawler.pages_crawled += 1
+                            pending[pool.submit(self.crawl, url)] = (url, depth)
+                    if not pending:
+                        if not should_continue() or frontier.finished():
+                            break
+                        # Other workers may still push outlinks, or a crashed worker's lease may expire.
+                        self.seed()
+                        crawler.cancelled.wait(self.poll_interval)
+                        continue
+                    done, _ = wait(pending, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, depth = pending.pop(future)
+                        try:
+                            new_urls, results = future.result()
+                        except Exception as e:
+                            crawler.status_messages.append(f"Error processing {url}: {str(e)}")
+                            new_urls, results = [], []
+                        if new_urls is None:
+                            frontier.release(self.owner, [url])
+                            with crawler.lock:
+                                crawler.pages_crawled -= 1
+                            continue
+                        frontier.complete(self.owner, url, new_urls, depth, results)
+                        if on_page:
+                            on_page(url, new_urls)
+                    if time.monotonic() - renewed >= frontier.lease_seconds / 3:
+                        frontier.renew(self.owner)
+                        renewed = time.monotonic()
+        finally:
+            if pending:
+                frontier.release(self.owner, [url for url, _ in pending.values()])
+        return crawler.pages_crawled
+
+class StandardExplorer:
+    # Homepage links and every category are explored at once under the crawler's page budget. 
+    # The first match sets `found`, after which no new page or listing fetch is started and pages 
+    # in flight stop at their next stage boundary and give their claim back.
+    def __init__(self, crawler, max_workers=None):
+        self.crawler = crawler
+        self.max_workers = max_workers or crawler.max_workers
+        self.found = threading.Event()
+        self.batches = deque()
+
+    def next_url(self):
+        # Take URLs round-robin so every category gets a share of the budget.
+        while self.batches:
+            batch = self.batches.popleft()
+            if batch:
+                url = batch.popleft()
+                self.batches.append(batch)
+                return url
+        return None
+
+    def listing(self, source, *args):
+        if self.found.is_set():
+            return []
+        return source(*args)
+
+    def explore(self, url):
+        if self.found.is_set():
+            self.crawler.release_url(url)
+            return None
+        new_urls = self.crawler.crawl_claimed_url(url, self.found)
+        if self.crawler.results:
+            self.found.set()
+        return new_urls
+
+    def run(self, should_continue=lambda: True, on_page=None):
+        crawler = self.crawler
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending[pool.submit(self.listing, crawler.get_seed_urls)] = ('links', None)
+            pending[pool.submit(self.listing, crawler.extract_categories)] = ('categories', None)
+            while True:
+                while (len(pending) < self.max_workers and crawler.pages_crawled < crawler.max_pages and 
+                       not self.found.is_set() and should_continue()):
+                    url = self.next_url()
+                    if url is None:
+                        break
+                    if crawler.claim_url(url):
+                        pending[pool.submit(self.explore, url)] = ('page', url)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, url = pending.pop(future)
+                    try:
+                        value = future.result()
+                    except CrawlCancelled:
+                        value = []
+                    except Exception as e:
+                        crawler.status_messages.append(f"Error processing {url or kind}: {str(e)}")
+                        value = []
+                    if kind == 'categories':
+                        for cat_name, cat_url in value:
+                            if self.found.is_set() or not should_continue():
+                                break
+                            crawler.status_messages.append(f"Processing category: {cat_name}")
+                            pending[pool.submit(self.listing, crawler.get_category_pages, cat_url)] = ('links', None)
+                    elif kind == 'links':
+                        self.batches.append(deque(value))
+                    elif value is not None:
+                        crawler.finish_url(url)
+                        crawler.maybe_checkpoint()
+                        if on_page:
+                            on_page(url, value)
+        return crawler.pages_crawled
+
+class CrawlJob:
+    def __init__(self, crawler, exporter=None, metrics_interval=1.0, max_events=10000):
+        self.crawler = crawler
+        self.exporter = exporter
+        self.metrics_interval = metrics_interval
+        self.events = queue.Queue(maxsize=max_events)
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.close_on_exit = False
+        self.closed = False
+        self.metrics_sent = 0.0
+        self.thread = threading.Thread(target=self.run, name=f"crawl-{crawler.main_domain}", daemon=True)
+        crawler.results.add_listener(lambda record: self.emit('match', record))
+        crawler.status_messages.add_listener(lambda message: self.emit('status', message))
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def emit(self, *event):
+        # Drop the oldest event rather than grow without bound when nobody is polling.
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def on_page(self, url, new_urls):
+        crawler = self.crawler
+        self.emit('page', url, crawler.pages_crawled, crawler.max_pages)
+        if time.time() - self.metrics_sent >= self.metrics_interval:
+            self.metrics_sent = time.time()
+            self.emit('metrics', crawler.metrics.snapshot())
+            crawler.export_metrics()
+            if self.exporter:
+                self.exporter.flush()
+
+    def run(self):
+        crawler = self.crawler
+        try:
+            crawler.crawl(should_continue=lambda: not crawler.cancelled.is_set(), on_page=self.on_page)
+        except Exception as e:
+            crawler.status_messages.append(f"Error running crawl: {str(e)}")
+        finally:
+            complete = not crawler.cancelled.is_set()
+            crawler.save_checkpoint(complete=complete)
+            if self.exporter:
+                self.exporter.close()
+            crawler.export_metrics(final=True)
+            self.emit('metrics', crawler.metrics.snapshot())
+            self.emit('done', complete)
+            with self.lock:
+                self.done.set()
+                if self.close_on_exit:
+                    self.close()
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def cancel(self):
+        self.crawler.cancel()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def stop(self):
+        self.cancel()
+        with self.lock:
+            if self.done.is_set():
+                self.close()
+            else:
+                self.close_on_exit = True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.crawler.close()
+            if self.crawler.checkpoint is not None:
+                self.crawler.checkpoint.close()
+
+    def poll(self, limit=1000):
+        events = []
+        while len(events) < limit:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+CSV_FIELDS = [
+    'source_url', 'matched_url', 'campaign', 'keyword', 
+    'location_type', 'element', 'attribute',
+    'content_sample', 'timestamp'
+]
+
+def result_to_csv_row(result):
+    return {
+        'source_url': result['source_url'],
+        'matched_url': result['matched_url'],
+        'campaign': result['campaign'],
+        'keyword': result['keyword'],
+        'location_type': result['location_type'],
+        'element': result['element'],
+        'attribute': result['attribute'],
+        'content_sample': result['content'][:300],
+        'timestamp': result['timestamp']
+    }
+
+RESULT_FIELDS = ['source_url', 'matched_url', 'campaign', 'keyword', 'location_type', 
+                 'element', 'attribute', 'content', 'timestamp']
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+EXPORT_DIR = os.path.join(CACHE_DIR, 'exports')
+
+class ResultExporter:
+    def __init__(self, path, fmt='csv', flush_every=50):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.fmt = fmt
+        self.mime = EXPORT_FORMATS[fmt]
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.count = 0
+        self.unflushed = 0
+        self.closed = False
+        if fmt == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+            self.pa = pyarrow
+            self.schema = pyarrow.schema([(field, pyarrow.string()) for field in RESULT_FIELDS])
+            self.file = pyarrow.parquet.ParquetWriter(path, self.schema)
+            self.buffer = []
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            if fmt == 'csv':
+                self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+                self.writer.writeheader()
+
+    @classmethod
+    def for_new_report(cls, fmt='csv', directory=EXPORT_DIR, prefix='crawl_report'):
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        return cls(os.path.join(directory, f"{prefix}_{stamp}.{fmt}"), fmt)
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    def write(self, result):
+        with self.lock:
+            if self.closed:
+                return
+            if self.fmt == 'csv':
+                self.writer.writerow(result_to_csv_row(result))
+            else:
+                row = {field: result[field] for field in RESULT_FIELDS}
+                if self.fmt == 'jsonl':
+                    self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                else:
+                    self.buffer.append(row)
+            self.count += 1
+            self.unflushed += 1
+            if self.unflushed >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        if self.fmt == 'parquet':
+            if self.buffer:
+                self.file.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+                self.buffer = []
+        else:
+            self.file.flush()
+        self.unflushed = 0
+
+    def flush(self):
+        with self.lock:
+            if not self.closed:
+                self._flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._flush()
+            self.file.close()
+            self.closed = True
+
+    def read(self):
+        self.flush()
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+UI_POLL_INTERVAL = 0.5
+
+def render_metrics(container, snapshot):
+    counters = snapshot['counters']
+    with container.container():
+        st.subheader("Crawl Metrics")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Pages/sec", snapshot['pages_per_second'])
+        col2.metric("Downloaded", f"{counters.get('bytes_downloaded', 0) / 1048576:.1f} MB")
+        response_lookups = counters.get('response_cache_hits', 0) + counters.get('response_cache_misses', 0)
+        col3.metric("Response cache hits", 
+                    f"{counters.get('response_cache_hits', 0)}/{response_lookups}")
+        redirect_lookups = counters.get('redirect_cache_hits', 0) + counters.get('redirect_cache_misses', 0)
+        col4.metric("Redirect cache hits", 
+                    f"{counters.get('redirect_cache_hits', 0)}/{redirect_lookups}")
+        st.dataframe([{'stage': stage, **timer} for stage, timer in snapshot['stages'].items()])
+
+def render_match_history(index):
+    st.subheader("Match History")
+    col1, col2, col3, col4 = st.columns(4)
+    keyword = col1.selectbox("Keyword", ["Any"] + index.facet('keyword'), key='history_keyword')
+    campaign = col2.selectbox("Campaign", ["Any"] + index.facet('campaign'), key='history_campaign')
+    location_type = col3.selectbox("Location", ["Any"] + index.facet('location_type'), key='history_location')
+    days = col4.number_input("Crawled in the last N days (0 for all)", min_value=0, value=30, step=1, 
+                             key='history_days')
+    col1, col2, col3 = st.columns(3)
+    source_domain = col1.text_input("Source domain", key='history_source_domain')
+    matched_url = col2.text_input("Matched URL starts with", key='history_matched_url')
+    text = col3.text_input("Search content", key='history_text')
+    filters = {
+        'keyword': None if keyword == "Any" else keyword,
+        'campaign': None if campaign == "Any" else campaign,
+        'location_type': None if location_type == "Any" else location_type,
+        'since': datetime.date.today() - datetime.timedelta(days=int(days)) if days else None,
+        'source_domain': source_domain.strip() or None,
+        'matched_url': matched_url.strip() or None,
+        'text': text.strip() or None
+    }
+    started = time.perf_counter()
+    try:
+        total = index.count(**filters)
+        sites = index.sites(**filters)
+        matches = index.query(limit=200, **filters)
+    except Exception as e:
+        st.error(f"Error querying match history: {str(e)}")
+        return
+    st.caption(f"{total} matches on {len(sites)}{'+' if len(sites) == 100 else ''} sites "
+               f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+    if sites:
+        st.dataframe(sites)
+    if matches:
+        st.dataframe(matches)
 
 def main():
     st.set_page_config(page_title="Enhanced Web Crawler", page_icon="🌐", layout="wide")
@@ -442,114 +3505,114 @@ def main():
         st.session_state.running = False
         st.session_state.results = []
         st.session_state.status = []
-        st.session_state.categories = []
+        st.session_state.exporter = None
+        st.session_state.job = None
+        st.session_state.progress = 0.0
+        st.session_state.metrics = None
 
     # UI Components
     st.title("Enhanced Web Crawler")
-    st.write("Search for GoWithGuide references on a website with improved detection.")
-    col1, col2 = st.columns([3, 1])
+    st.write("Search a website for affiliate references from every configured campaign in one crawl.")
+    try:
+        campaigns = load_campaigns()
+    except Exception as e:
+        st.error(f"Error loading campaigns from {CAMPAIGNS_PATH}: {str(e)}")
+        campaigns = list(DEFAULT_CAMPAIGNS)
+    col1, col2, col3 = st.columns([3, 1, 1])
     with col1:
         url_input = st.text_input("Enter website URL:", "https://example.com")
     with col2:
         crawl_mode = st.selectbox("Crawl Mode:", ["Quick", "Standard", "Complete"], index=1)
+    with col3:
+        export_format = st.selectbox("Export Format:", ["CSV", "JSONL", "Parquet"], index=0)
+    resume_crawl = st.checkbox("Resume from last checkpoint", value=True)
+    incremental = st.checkbox("Incremental recrawl (reuse results for unchanged pages)", value=False)
+    bounded_memory = st.checkbox("Bounded memory (for very large sites)", value=False)
+    parse_processes = st.number_input("Parse processes (0 parses in the crawler threads; only helps with spare "
+                                      "CPU cores and large pages)", min_value=0, 
+                                      max_value=max(0, (os.cpu_count() or 1) - 1), value=0, step=1)
+    campaign_names = st.multiselect("Campaigns:", [campaign.name for campaign in campaigns], 
+                                    default=[campaign.name for campaign in campaigns])
     start_btn = st.button("Start Crawling")
     stop_btn = st.button("Stop & Reset")
 
     # Status and Results Display
     status_container = st.empty()
+    metrics_container = st.empty()
     results_container = st.empty()
 
     # Handle Start Button
-    if start_btn and not st.session_state.running:
+    if start_btn and not st.session_state.running and not campaign_names:
+        st.warning("Select at least one campaign.")
+    elif start_btn and not st.session_state.running:
         if not url_input.startswith(('http://', 'https://')):
             url_input = f'https://{url_input}'
-        st.session_state.crawler = EnhancedWebCrawler(start_url=url_input, crawl_mode=crawl_mode)
+        if st.session_state.job:
+            st.session_state.job.stop()
+        checkpoint = CrawlCheckpoint()
+        crawler = EnhancedWebCrawler(start_url=url_input, crawl_mode=crawl_mode, checkpoint=checkpoint, 
+                                     incremental=incremental, 
+                                     memory_budget=MemoryBudget() if bounded_memory else None, 
+                                     parse_processes=int(parse_processes), 
+                                     campaigns=[campaign for campaign in campaigns if campaign.name in campaign_names])
+        exporter = ResultExporter.for_new_report(export_format.lower())
+        crawler.results.add_listener(exporter.write)
+        st.session_state.exporter = exporter
+        st.session_state.crawler = crawler
+        MetricsServer.publish(crawler.metrics, crawler.metrics_labels())
         st.session_state.running = True
         st.session_state.results = []
-        st.session_state.status = [f"Starting crawl of {url_input} in {crawl_mode} mode"]
-        st.session_state.categories = []
+        st.session_state.status = crawler.memory_budget.status_log() if bounded_memory else []
+        st.session_state.status.append(f"Starting crawl of {url_input} in {crawl_mode} mode")
+        st.session_state.progress = 0.0
+        st.session_state.metrics = None
+        if resume_crawl and crawler.resume():
+            st.session_state.results = crawler.results
+            st.session_state.status.append(
+                f"Resumed from checkpoint: {crawler.pages_crawled} pages, {len(crawler.results)} matches")
+        else:
+            checkpoint.discard(url_input, crawl_mode)
+        st.session_state.job = CrawlJob(crawler, exporter).start()
 
     # Handle Stop Button
     if stop_btn:
+        if st.session_state.job:
+            st.session_state.job.stop()
+        st.session_state.job = None
+        st.session_state.exporter = None
         st.session_state.running = False
         st.session_state.crawler = None
         st.session_state.results = []
         st.session_state.status = []
-        st.session_state.categories = []
+        st.session_state.metrics = None
 
-    # Crawling Logic
-    if st.session_state.running and st.session_state.crawler:
+    # Crawl Progress
+    if st.session_state.crawler and st.session_state.job:
         crawler = st.session_state.crawler
-        progress_bar = st.progress(0)
-        total_pages = crawler.max_pages
-
-        if crawler.crawl_mode == "Quick":
-            urls_to_crawl = [crawler.start_url]
-            for i, url in enumerate(urls_to_crawl):
-                if not st.session_state.running:
-                    break
-                st.session_state.status.append(f"Crawling: {url}")
-                crawler.process_url(url)
-                st.session_state.results = crawler.results
-                progress_bar.progress((i + 1) / len(urls_to_crawl))
-            st.session_state.running = False
-
-        elif crawler.crawl_mode == "Standard":
-            if not st.session_state.categories:
-                homepage_links = crawler.get_main_pages()
-                st.session_state.status.append("Crawling homepage and main pages...")
-                urls_to_crawl = [crawler.start_url] + homepage_links
-                for i, url in enumerate(urls_to_crawl[:crawler.max_pages]):
-                    if not st.session_state.running:
-                        break
-                    st.session_state.status.append(f"Crawling: {url}")
-                    crawler.process_url(url)
-                    st.session_state.results = crawler.results
-                    progress_bar.progress((i + 1) / min(crawler.max_pages, len(urls_to_crawl)))
-                    if crawler.results:
-                        st.session_state.status.append(f"Found {len(crawler.results)} matches")
-                        break
-                if not crawler.results:
-                    st.session_state.categories = crawler.extract_categories()
-                    if st.session_state.categories:
-                        st.session_state.status.append(f"Found categories: {', '.join([c[0] for c in st.session_state.categories])}")
-                    else:
-                        st.session_state.status.append("No categories found.")
-                        st.session_state.running = False
-            elif st.session_state.categories:
-                cat_name, cat_url = st.session_state.categories.pop(0)
-                st.session_state.status.append(f"Processing category: {cat_name}")
-                category_links = crawler.get_category_pages(cat_url)
-                for i, url in enumerate(category_links[:crawler.max_pages]):
-                    if not st.session_state.running:
-                        break
-                    st.session_state.status.append(f"Crawling: {url}")
-                    crawler.process_url(url)
-                    st.session_state.results = crawler.results
-                    progress_bar.progress((i + 1) / min(crawler.max_pages, len(category_links)))
-                    if crawler.results:
-                        st.session_state.status.append(f"Found {len(crawler.results)} matches")
-                        break
-                if not st.session_state.categories and not crawler.results:
-                    st.session_state.running = False
-
-        elif crawler.crawl_mode == "Complete":
-            while crawler.queue and crawler.pages_crawled < crawler.max_pages and st.session_state.running:
-                url = crawler.queue.popleft()
-                if url not in crawler.visited:
-                    st.session_state.status.append(f"Crawling: {url} (Page {crawler.pages_crawled + 1}/{crawler.max_pages})")
-                    new_urls = crawler.process_url(url)
-                    for new_url in new_urls:
-                        if (new_url not in crawler.visited and 
-                            new_url not in crawler.queue and 
-                            crawler.pages_crawled < crawler.max_pages):
-                            crawler.queue.append(new_url)
-                    st.session_state.results = crawler.results
-                    progress_bar.progress(min(crawler.pages_crawled / crawler.max_pages, 1.0))
-                    if crawler.results:
-                        st.session_state.status.append(f"Found {len(crawler.results)} matches")
-            if crawler.pages_crawled >= crawler.max_pages or not crawler.queue:
+        exporter = st.session_state.exporter
+        job = st.session_state.job
+        for event in job.poll():
+            if event[0] == 'page':
+                _, url, pages, max_pages = event
+                st.session_state.status.append(f"Crawled: {url} (Page {pages}/{max_pages})")
+                st.session_state.progress = min(pages / max_pages, 1.0)
+            elif event[0] == 'match':
+                st.session_state.status.append(
+                    f"Found {event[1]['keyword']} ({event[1]['campaign']}) on {event[1]['source_url']} "
+                    f"({len(crawler.results)} matches)")
+            elif event[0] == 'status':
+                st.session_state.status.append(event[1])
+            elif event[0] == 'metrics':
+                st.session_state.metrics = event[1]
+            elif event[0] == 'done':
                 st.session_state.running = False
+                if event[1]:
+                    st.session_state.progress = 1.0
+                st.session_state.status.append(
+                    f"Crawl {'finished' if event[1] else 'stopped'}: {crawler.pages_crawled} pages, "
+                    f"{len(crawler.results)} matches")
+        st.session_state.results = crawler.results
+        st.progress(st.session_state.progress)
 
         # Display Status
         with status_container.container():
@@ -558,6 +3621,8 @@ def main():
             for msg in st.session_state.status[-10:]:
                 st.write(msg)
             st.markdown('</div>', unsafe_allow_html=True)
+        if st.session_state.metrics:
+            render_metrics(metrics_container, st.session_state.metrics)
 
         # Display Results and Options
         if st.session_state.results:
@@ -569,40 +3634,55 @@ def main():
                     **Match {i}:**  
                     **Source URL:** {result['source_url']}  
                     **Matched URL:** {result['matched_url']}  
+                    **Campaign:** {result['campaign']}  
                     **Keyword:** {result['keyword']}  
                     **Location:** {result['location_type']}  
                     **Element:** {result['element']} [{result['attribute']}]  
                     **Content:** `{result['content'][:100]}...`
                     """)
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if st.button("Save Results & Stop"):
-                        csv_data = generate_csv(crawler.results)
-                        st.download_button(
-                            label="Download CSV",
-                            data=csv_data,
-                            file_name=f"crawl_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv"
-                        )
-                        st.session_state.running = False
-                        crawler.user_stopped = True
-                with col2:
-                    if st.button("Continue to Next Category") and crawler.crawl_mode != "Complete":
-                        crawler.pages_crawled = 0
-                with col3:
-                    if st.button("Continue Current Category") and crawler.crawl_mode != "Complete":
-                        crawler.pages_crawled = 0
+                if st.button("Save Results & Stop"):
+                    job.cancel()
+                    job.wait()
+                    st.download_button(
+                        label=f"Download {exporter.fmt.upper()}",
+                        data=exporter.read(),
+                        file_name=exporter.file_name,
+                        mime=exporter.mime
+                    )
+                    st.session_state.running = False
+                    crawler.user_stopped = True
                 st.markdown('</div>', unsafe_allow_html=True)
 
         # Final Report
         if not st.session_state.running and st.session_state.results and not crawler.user_stopped:
-            csv_data = generate_csv(crawler.results)
             st.download_button(
                 label="Download Final Results",
-                data=csv_data,
-                file_name=f"crawl_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+                data=exporter.read(),
+                file_name=exporter.file_name,
+                mime=exporter.mime
             )
 
+        if not st.session_state.running and crawler.page_states:
+            changes = crawler.match_changes
+            st.subheader("Changes Since Last Crawl")
+            st.write(f"{changes.count('new')} new, {changes.count('gone')} gone, "
+                     f"{changes.count('unchanged')} unchanged matches "
+                     f"({crawler.pages_reused} unchanged pages reused)")
+            report = crawler.change_report(limit=1000 if crawler.memory_budget else None)
+            if report:
+                st.dataframe(report)
+
+    with st.expander("Match history across crawls"):
+        try:
+            if st.session_state.get('match_index') is None:
+                st.session_state.match_index = MatchIndex()
+            render_match_history(st.session_state.match_index)
+        except Exception as e:
+            st.error(f"Error opening match index: {str(e)}")
+
+    if st.session_state.running:
+        time.sleep(UI_POLL_INTERVAL)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
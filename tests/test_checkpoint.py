@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from site_server import SiteConfig, SiteServer
+from stayalive import CrawlCheckpoint, EnhancedWebCrawler
+
+def make_crawler(start_url, checkpoint=None, max_workers=2):
+    return EnhancedWebCrawler(start_url, 'Complete', max_workers=max_workers, requests_per_second=500.0, 
+                              checkpoint=checkpoint, checkpoint_interval=1, redirect_cache_path=None, 
+                              response_cache_path=None, script_cache_path=None, match_index_path=None)
+
+def match_keys(crawler):
+    return {(r.source_url, r.matched_url, r.campaign, r.keyword, r.location_type) for r in crawler.results}
+
+def test_resume_recrawls_pages_that_were_in_flight_at_the_last_checkpoint(tmp_path):
+    with SiteServer(SiteConfig(pages=60, external_scripts=0)) as server:
+        baseline = make_crawler(server.url)
+        baseline.crawl()
+        baseline.close()
+        assert baseline.results
+
+        # Match pages block until a checkpoint has been saved while one of them is in flight. Every
+        # save after that is dropped, as if the process had died between claiming and finishing them.
+        checkpoint = CrawlCheckpoint(str(tmp_path / 'checkpoints.sqlite'))
+        first = make_crawler(server.url, checkpoint)
+        stuck = {server.url.rstrip('/') + first_path for first_path in 
+                 (server.site.post_path(i) for i in range(60) if server.site.is_match_page(i))}
+        crashed = threading.Event()
+        save = checkpoint.save
+        crawl_claimed_url = first.crawl_claimed_url
+
+        def saving(crawler, complete=False):
+            if crashed.is_set():
+                return
+            save(crawler, complete)
+            if stuck & set(crawler.in_flight):
+                crashed.set()
+
+        def crawling(url):
+            if url in stuck:
+                assert crashed.wait(30)
+            return crawl_claimed_url(url)
+
+        checkpoint.save = saving
+        first.crawl_claimed_url = crawling
+        first.crawl()
+        first.close()
+        assert crashed.is_set()
+
+        checkpoint.save = save
+        second = make_crawler(server.url, checkpoint)
+        assert second.resume()
+        second.crawl()
+        second.close()
+        checkpoint.close()
+
+    assert second.pages_crawled == baseline.pages_crawled
+    assert match_keys(second) == match_keys(baseline)
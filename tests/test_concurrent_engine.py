@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from site_server import SiteConfig, SiteServer
+from stayalive import EnhancedWebCrawler
+
+def crawl(server, max_workers, max_pages=None):
+    crawler = EnhancedWebCrawler(server.url, 'Complete', max_workers=max_workers, requests_per_second=1000.0, 
+                                 redirect_cache_path=None, response_cache_path=None, script_cache_path=None, 
+                                 match_index_path=None)
+    if max_pages:
+        crawler.max_pages = max_pages
+    visits = Counter()
+    lock = threading.Lock()
+    crawl_page = crawler.crawl_page
+
+    def counting(url, *args):
+        with lock:
+            visits[crawler.frontier.canonicalize(url)] += 1
+        return crawl_page(url, *args)
+
+    crawler.crawl_page = counting
+    crawler.crawl()
+    crawler.close()
+    return crawler, visits
+
+def match_keys(crawler):
+    return {(r.source_url, r.matched_url, r.campaign, r.keyword, r.location_type, r.element, r.attribute) 
+            for r in crawler.results}
+
+def test_page_budget_is_exact_and_no_page_is_visited_twice():
+    with SiteServer(SiteConfig(pages=300, external_scripts=0, latency=0.005)) as server:
+        crawler, visits = crawl(server, max_workers=20, max_pages=50)
+    assert crawler.pages_crawled == 50
+    assert sum(visits.values()) == 50
+    assert max(visits.values()) == 1
+
+def test_concurrent_crawl_matches_the_sequential_crawl():
+    with SiteServer(SiteConfig(pages=80, match_every=7, external_scripts=1)) as server:
+        sequential, sequential_visits = crawl(server, max_workers=1)
+        concurrent, concurrent_visits = crawl(server, max_workers=20)
+    assert max(concurrent_visits.values()) == 1
+    assert set(concurrent_visits) == set(sequential_visits)
+    assert concurrent.pages_crawled == sequential.pages_crawled
+    assert match_keys(concurrent) == match_keys(sequential)
+    assert match_keys(sequential)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import DomExtractor
+
+SOURCE_URL = 'https://example.test/'
+
+def extract(backend, body):
+    return DomExtractor(backend).extract(f'<html><body>{body}</body></html>'.encode(), SOURCE_URL)
+
+@pytest.mark.parametrize('backend', DomExtractor.BACKENDS)
+def test_nested_text_joins_the_enclosing_container(backend):
+    extraction = extract(backend, '<div><p>go with <span>guide</span></p><p>go <b>with</b> <a href="/g">guide</a></p>'
+                                  '<div>go with <div>guide</div></div></div>')
+    assert extraction.texts == [
+        (SOURCE_URL, 'p', 'text', 'go with guide', 'content'),
+        (SOURCE_URL, 'p', 'text', 'go with guide', 'content'),
+        (SOURCE_URL + 'g', 'a', 'text', 'guide', 'anchor_text'),
+        (SOURCE_URL, 'div', 'text', 'go with guide', 'content'),
+    ]
+
+@pytest.mark.parametrize('backend', DomExtractor.BACKENDS)
+def test_link_and_base_hrefs_are_not_harvested(backend):
+    extraction = DomExtractor(backend).extract(
+        b'<html><head><link rel="stylesheet" href="/site.css"><base href="/b/"></head>'
+        b'<body><a href="/go">go</a></body></html>', SOURCE_URL)
+    assert extraction.links == [SOURCE_URL + 'go']
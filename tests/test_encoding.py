@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import SNIFF_BYTES, sniff_encoding
+
+def test_undeclared_charset_is_sniffed_from_a_prefix():
+    assert sniff_encoding('café'.encode('utf-8'), {}) == 'utf-8'
+    assert sniff_encoding('café'.encode('windows-1252'), {}) == 'windows-1252'
+    assert sniff_encoding(b'a' * (SNIFF_BYTES - 1) + 'é'.encode('utf-8'), {}) == 'utf-8'
+    assert sniff_encoding(b'a' * (SNIFF_BYTES - 10) + b'\xe9' + b'a' * 20, {}) == 'windows-1252'
+
+def test_declared_charset_wins():
+    assert sniff_encoding(b'caf\xe9', {'Content-Type': 'text/html; charset=iso-8859-1'}) == 'iso-8859-1'
+    assert sniff_encoding(b'<meta charset="utf-8">', {}) == 'utf-8'
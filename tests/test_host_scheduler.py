@@ -0,0 +1,47 @@
+import io
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import CrawlMetrics, HostScheduler
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0) if self.statuses else 200
+        response.headers['Retry-After'] = '0'
+        response.raw = io.BytesIO(b'')
+        return response
+
+def test_throttled_host_rate_recovers_after_successes():
+    scheduler = HostScheduler(FakeSession([429, 503]), requests_per_second=20.0, max_retries=3, 
+                              respect_robots=False)
+    url = 'http://example.test/'
+    assert scheduler.request('GET', url).status_code == 200
+    bucket = scheduler.host_state('example.test')[1]
+    assert bucket.rate < 20.0
+    for _ in range(40):
+        scheduler.request('GET', url)
+    assert bucket.rate == 20.0
+
+def test_throttling_never_exceeds_the_configured_rate():
+    scheduler = HostScheduler(FakeSession([]), requests_per_second=0.2, respect_robots=False)
+    bucket = scheduler.host_state('example.test')[1]
+    bucket.throttle()
+    assert bucket.rate == 0.2
+
+def test_throttle_waits_are_not_reported_as_fetch_time():
+    metrics = CrawlMetrics()
+    scheduler = HostScheduler(FakeSession([]), per_host_limit=1, requests_per_second=10.0, respect_robots=False, 
+                              metrics=metrics)
+    for _ in range(6):
+        scheduler.request('GET', 'http://example.test/', stage='fetch')
+    stages = metrics.snapshot()['stages']
+    assert stages['fetch']['count'] == 6
+    assert stages['fetch']['total_seconds'] < 0.1
+    assert stages['throttle_wait']['total_seconds'] >= 0.4
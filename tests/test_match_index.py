@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import CrawlCheckpoint, EnhancedWebCrawler, MatchIndex
+
+START_URL = 'http://example.test/'
+
+def make_crawler(tmp_path, checkpoint):
+    return EnhancedWebCrawler(START_URL, 'Complete', checkpoint=checkpoint, redirect_cache_path=None,
+                              response_cache_path=None, script_cache_path=None, use_sitemaps=False,
+                              respect_robots=False, match_index_path=str(tmp_path / 'matches.sqlite'))
+
+def test_resumed_matches_are_not_indexed_twice(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'checkpoints.sqlite'))
+    first = make_crawler(tmp_path, checkpoint)
+    first.results.add(START_URL, START_URL + 'go', 'a', 'href', 'gowithguide', '87121', '', 'url')
+    first.flush_index()
+    first.save_checkpoint()
+    first.close()
+
+    second = make_crawler(tmp_path, checkpoint)
+    assert second.resume()
+    assert len(second.results) == 1
+    second.results.add(START_URL + 'p', START_URL + 'go', 'a', 'href', 'gowithguide', '87121', '', 'url')
+    second.flush_index(final=True)
+    second.close()
+    checkpoint.close()
+
+    index = MatchIndex(str(tmp_path / 'matches.sqlite'))
+    assert index.count() == 2
+    index.close()
@@ -0,0 +1,41 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from site_server import SiteConfig, SiteServer
+from stayalive import CachedResponse, EnhancedWebCrawler, MemoryBudget, ResponseCache, SpillingMatchChanges
+
+def test_response_memory_tier_is_bounded_by_bytes():
+    cache = ResponseCache(max_entries=256, max_memory_bytes=10000)
+    for i in range(20):
+        url = f'http://example.test/{i}'
+        cache.put(url, CachedResponse(url, 200, {'Content-Type': 'text/html'}, b'x' * 1000))
+    assert cache.memory_bytes <= 10000
+    assert len(cache.memory) == 10
+    assert cache.get('http://example.test/19') is not None
+    assert cache.get('http://example.test/0') is None
+
+def test_bounded_incremental_crawl_spills_match_changes(tmp_path):
+    def crawl(server):
+        crawler = EnhancedWebCrawler(server.url, 'Complete', requests_per_second=500.0, incremental=True, 
+                                     page_state_path=str(tmp_path / 'pages.sqlite'), redirect_cache_path=None, 
+                                     response_cache_path=None, script_cache_path=None, match_index_path=None, 
+                                     memory_budget=MemoryBudget(spill_dir=str(tmp_path / 'spill')))
+        crawler.crawl()
+        return crawler
+
+    with SiteServer(SiteConfig(pages=40, match_every=5, external_scripts=0)) as server:
+        first = crawl(server)
+        first.close()
+        second = crawl(server)
+
+    changes = second.match_changes
+    assert isinstance(changes, SpillingMatchChanges)
+    assert changes.count('new') == 0
+    assert changes.count('unchanged') == len(second.results) > 5
+    assert len(second.change_report(limit=5)) == 5
+    assert second.response_cache.max_memory_bytes == MemoryBudget().response_cache_bytes
+    second.close()
+    assert changes.count('unchanged') == len(second.results)
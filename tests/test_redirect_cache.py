@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import RedirectCache
+
+def rows(cache):
+    return [row[0] for row in cache.conn.execute("SELECT url FROM redirects ORDER BY url")]
+
+def test_expired_redirects_are_purged_when_the_cache_is_opened(tmp_path):
+    path = str(tmp_path / 'redirects.sqlite')
+    cache = RedirectCache(path, ttl=60)
+    cache.put('http://example.test/old', 'http://example.test/final', [])
+    cache.put('http://example.test/new', 'http://example.test/final', [])
+    with cache.conn:
+        cache.conn.execute("UPDATE redirects SET resolved_at = ? WHERE url = 'http://example.test/old'", 
+                           (time.time() - 120,))
+    cache.close()
+
+    recent = RedirectCache(path, ttl=60)
+    assert rows(recent) == ['http://example.test/new', 'http://example.test/old']
+    recent.close()
+
+    stale = RedirectCache(path, ttl=60)
+    with stale.conn:
+        stale.conn.execute("UPDATE purges SET purged_at = ?", (time.time() - 2 * 24 * 3600,))
+    stale.close()
+    reopened = RedirectCache(path, ttl=60)
+    assert rows(reopened) == ['http://example.test/new']
+    reopened.close()
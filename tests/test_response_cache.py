@@ -0,0 +1,31 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import CachedResponse, ResponseCache
+
+def response(url, size, fetched_at):
+    return CachedResponse(url, 200, {'Content-Type': 'text/html'}, b'x' * size, fetched_at=fetched_at)
+
+def test_disk_tier_evicts_the_oldest_responses_past_its_byte_limit(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    cache = ResponseCache(max_entries=1, disk_path=path, max_disk_bytes=10000)
+    for i in range(20):
+        cache.put(f'http://example.test/{i}', response(f'http://example.test/{i}', 1000, fetched_at=1000.0 + i))
+    cache.close()
+
+    conn = sqlite3.connect(path)
+    urls = [row[0] for row in conn.execute("SELECT url FROM responses ORDER BY fetched_at")]
+    total = conn.execute("SELECT SUM(length(content) + length(headers)) FROM responses").fetchone()[0]
+    conn.close()
+    assert total <= 10000
+    assert urls[-1] == 'http://example.test/19'
+    assert 'http://example.test/0' not in urls
+
+def test_oversized_responses_stay_in_memory_only(tmp_path):
+    cache = ResponseCache(max_entries=4, disk_path=str(tmp_path / 'responses.sqlite'), max_disk_bytes=1000)
+    cache.put('http://example.test/big', response('http://example.test/big', 5000, fetched_at=1000.0))
+    assert cache.get('http://example.test/big') is not None
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    cache.close()
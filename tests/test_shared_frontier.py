@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import SharedFrontier
+
+START_URL = 'http://example.test/'
+
+def make_frontier(path, max_pages=3):
+    frontier = SharedFrontier(START_URL, path=str(path), max_pages=max_pages, lease_seconds=60)
+    frontier.open()
+    frontier.seed([START_URL] + [f'{START_URL}p/{i}' for i in range(10)])
+    return frontier
+
+def expire_leases(frontier, owner):
+    with frontier.transaction() as conn:
+        conn.execute("UPDATE frontier_urls SET lease_expires = ? WHERE owner = ?", (time.time() - 1, owner))
+
+def test_completing_an_expired_lease_keeps_the_global_budget(tmp_path):
+    frontier = make_frontier(tmp_path / 'frontier.sqlite')
+    leased_a = frontier.lease('a', 3)
+    assert len(leased_a) == 3
+    expire_leases(frontier, 'a')
+    leased_b = frontier.lease('b', 1)
+    assert leased_b == leased_a[:1]
+    for url, depth in leased_a:
+        frontier.complete('a', url, depth=depth)
+    assert frontier.lease('c', 2) == []
+    status = frontier.status()
+    assert status['claimed'] == 4
+    assert status['leased'] == 1
+    with frontier.lock:
+        owner, state = frontier.conn.execute(
+            "SELECT owner, state FROM frontier_urls WHERE canonical = ?", 
+            (frontier.canonicalize(leased_b[0][0]),)).fetchone()
+    assert (owner, state) == ('b', SharedFrontier.LEASED)
+    frontier.close()
+
+def test_completing_a_held_lease_does_not_charge_twice(tmp_path):
+    frontier = make_frontier(tmp_path / 'frontier.sqlite')
+    for url, depth in frontier.lease('a', 2):
+        frontier.complete('a', url, depth=depth)
+    status = frontier.status()
+    assert status['claimed'] == 2
+    assert status['done'] == 2
+    assert len(frontier.lease('b', 5)) == 1
+    frontier.close()
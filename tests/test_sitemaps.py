@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from site_server import SiteConfig, SiteServer
+from stayalive import CrawlCancelled, EnhancedWebCrawler, SitemapDiscovery
+
+def make_crawler(server):
+    return EnhancedWebCrawler(server.url, 'Complete', requests_per_second=500.0, redirect_cache_path=None, 
+                              response_cache_path=None, script_cache_path=None, match_index_path=None)
+
+def test_sitemap_entries_are_discovered():
+    with SiteServer(SiteConfig(pages=30)) as server:
+        crawler = make_crawler(server)
+        urls = SitemapDiscovery(crawler).discover(10)
+        crawler.close()
+    assert len(urls) == 10
+
+def test_stopping_during_sitemap_discovery_stops_the_crawl():
+    with SiteServer(SiteConfig(pages=30)) as server:
+        crawler = make_crawler(server)
+        crawler.cancel()
+        with pytest.raises(CrawlCancelled):
+            SitemapDiscovery(crawler).discover(10)
+        crawler.crawl()
+        crawler.close()
+    assert crawler.pages_crawled == 0
+    assert crawler.status_messages.errors == 0
+    assert not any('sitemap' in message for message in crawler.status_messages)
@@ -0,0 +1,34 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from site_server import SiteConfig, SiteServer
+from stayalive import EnhancedWebCrawler, StandardExplorer
+
+def test_pages_in_flight_stop_and_release_their_claim_after_the_first_match():
+    with SiteServer(SiteConfig(pages=200, match_every=10, slow_every=2, slow_delay=0.3)) as server:
+        crawler = EnhancedWebCrawler(server.url, 'Standard', max_workers=20, requests_per_second=500.0, 
+                                     redirect_cache_path=None, response_cache_path=None, 
+                                     script_cache_path=None, match_index_path=None)
+        crawler.max_pages = 200
+        explorer = StandardExplorer(crawler)
+        late = []
+        analyse = crawler.script_analyzer.analyse
+
+        def analysing(*args):
+            late.append(explorer.found.is_set())
+            return analyse(*args)
+
+        crawler.script_analyzer.analyse = analysing
+        finished = []
+        explorer.run(on_page=lambda url, new_urls: finished.append(url))
+        crawler.close()
+
+    assert explorer.found.is_set()
+    assert crawler.results
+    assert crawler.interrupted
+    assert crawler.pages_crawled == len(finished)
+    assert not crawler.in_flight
+    assert late.count(True) <= 1
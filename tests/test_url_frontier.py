@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stayalive import URLFrontier
+
+def drain(frontier):
+    urls = []
+    while True:
+        entry = frontier.pop()
+        if entry is None:
+            return urls
+        urls.append(entry)
+
+def test_shallow_and_affiliate_looking_urls_come_first():
+    frontier = URLFrontier()
+    frontier.push('https://example.test/deep/page', 3)
+    frontier.push('https://example.test/about', 1)
+    frontier.push('https://example.test/tours/kyoto', 3)
+    frontier.push('https://example.test/contact', 1)
+    frontier.push('https://example.test/', 0)
+    assert drain(frontier) == [
+        ('https://example.test/', 0),
+        ('https://example.test/about', 1),
+        ('https://example.test/tours/kyoto', 3),
+        ('https://example.test/contact', 1),
+        ('https://example.test/deep/page', 3),
+    ]
+
+def test_canonical_duplicates_and_visited_urls_are_skipped():
+    frontier = URLFrontier()
+    assert frontier.push('https://Example.test/a?utm_source=x#top', 1)
+    assert not frontier.push('https://example.test/a/', 1)
+    frontier.push('https://example.test/b', 1)
+    frontier.mark_visited('https://example.test/b')
+    assert drain(frontier) == [('https://Example.test/a?utm_source=x', 1)]
@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from stayalive import (EnhancedWebCrawler, ResultExporter, SharedFrontier, MemoryBudget, EXPORT_FORMATS,
+                       CACHE_DIR, load_campaigns)
+
+def run_worker(start_url, frontier_path, max_workers=20, max_pages=1000, lease_seconds=120, disk_cache=True,
+               bounded_memory=False, parse_processes=0, campaigns=None):
+    started = time.time()
+    frontier = SharedFrontier(start_url, path=frontier_path, max_pages=max_pages, lease_seconds=lease_seconds)
+    cache_options = {} if disk_cache else {'redirect_cache_path': None, 'response_cache_path': None,
+                                             'script_cache_path': None, 'match_index_path': None}
+    crawler = EnhancedWebCrawler(start_url, 'Complete', max_workers=max_workers, shared_frontier=frontier,
+                                 memory_budget=MemoryBudget() if bounded_memory else None,
+                                 parse_processes=parse_processes, campaigns=campaigns, **cache_options)
+    failure = ''
+    try:
+        crawler.crawl()
+    except Exception as e:
+        failure = str(e)
+    crawler.close()
+    frontier.close()
+    return {
+        'pid': os.getpid(),
+        'pages': crawler.pages_crawled,
+        'matches': len(crawler.results),
+        'errors': crawler.status_messages.errors,
+        'reclaimed': frontier.reclaimed,
+        'wall_time': round(time.time() - started, 2),
+        'failure': failure
+    }
+
+def export_results(frontier, path, fmt):
+    exporter = ResultExporter(path, fmt)
+    for result in frontier.results():
+        exporter.write(result)
+    exporter.close()
+    return exporter.count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Crawl one site in Complete mode with several processes sharing a SQLite frontier. "
+                    "Run it again on the same --frontier file to add more workers to a crawl in progress.")
+    parser.add_argument('start_url')
+    parser.add_argument('--frontier', default=os.path.join(CACHE_DIR, 'frontier.sqlite'),
+                        help="Shared frontier database (SQLite, WAL mode)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Worker processes to start")
+    parser.add_argument('--workers', type=int, default=20, help="Concurrent fetches per process")
+    parser.add_argument('--max-pages', type=int, default=1000,
+                        help="Page budget shared by every worker (fixed by whoever starts the crawl)")
+    parser.add_argument('--lease-seconds', type=int, default=120,
+                        help="Leases not renewed within this time go back to other workers")
+    parser.add_argument('--reset', action='store_true', help="Discard any earlier state for this crawl first")
+    parser.add_argument('--no-disk-cache', action='store_true', help="Disable the shared on-disk caches")
+    parser.add_argument('--bounded-memory', action='store_true', help="Crawl with a MemoryBudget")
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help="Parse pages in this many processes per worker (capped at one less than the CPU count)")
+    parser.add_argument('--campaigns', default=None, help="Campaign config file (JSON)")
+    parser.add_argument('--output', default=None, help="Export every worker's results here when done")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help="Result file format")
+    args = parser.parse_args(argv)
+
+    start_url = args.start_url
+    if not start_url.startswith(('http://', 'https://')):
+        start_url = f'https://{start_url}'
+    campaigns = load_campaigns(args.campaigns)
+    frontier = SharedFrontier(start_url, path=args.frontier, max_pages=args.max_pages)
+    if args.reset:
+        frontier.discard()
+
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(run_worker, start_url, args.frontier, args.workers, args.max_pages,
+                               args.lease_seconds, not args.no_disk_cache, args.bounded_memory,
+                               args.parse_processes, campaigns)
+                   for _ in range(args.processes)]
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'pid': '?', 'pages': 0, 'matches': 0, 'errors': 1, 'reclaimed': 0, 'wall_time': 0,
+                           'failure': str(e)}
+            print(f"worker {summary['pid']}: {summary['pages']} pages, {summary['matches']} matches, "
+                  f"{summary['errors']} errors, {summary['reclaimed']} leases reclaimed, {summary['wall_time']}s"
+                  + (f" FAILED: {summary['failure']}" if summary['failure'] else ''), flush=True)
+
+    status = frontier.status()
+    print(f"Frontier: {status['done']} done, {status['pending']} pending, {status['leased']} leased, "
+          f"{status['claimed']}/{status['max_pages']} pages claimed, {status['results']} matches "
+          f"in {round(time.time() - started, 2)}s")
+    if args.output:
+        count = export_results(frontier, args.output, args.format)
+        print(f"Wrote {count} matches to {args.output}")
+    frontier.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())